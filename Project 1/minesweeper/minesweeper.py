@@ -1,5 +1,60 @@
 import itertools
+import math
 import random
+import time
+
+from collections import deque
+
+
+class Grid:
+    """
+    Layout of cells on a Minesweeper board
+    Each cell (i, j) is numbered i * width + j, so that a set of cells
+    can be stored as an integer bitset with one bit per cell.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+
+        # Precompute the bitset of neighbors of each cell
+        self.neighbors = []
+        for i in range(height):
+            for j in range(width):
+                mask = 0
+                for k in range(max(i - 1, 0), min(i + 2, height)):
+                    for m in range(max(j - 1, 0), min(j + 2, width)):
+                        if (k, m) != (i, j):
+                            mask |= 1 << (k * width + m)
+                self.neighbors.append(mask)
+
+    def index(self, cell):
+        """
+        Returns the number of a cell (i, j).
+        """
+        return cell[0] * self.width + cell[1]
+
+    def cell(self, index):
+        """
+        Returns the cell (i, j) with a given number.
+        """
+        return divmod(index, self.width)
+
+    def cells(self, mask):
+        """
+        Returns the list of cells (i, j) in a bitset.
+        """
+        return [self.cell(index) for index in bits(mask)]
+
+
+def bits(mask):
+    """
+    Yields the number of each cell in a bitset, in increasing order.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
 
 
 class Minesweeper:
@@ -12,23 +67,14 @@ class Minesweeper:
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.grid = Grid(height, width)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, as a set of cells and as a bitset
+        self.mines = set()
+        self.mine_mask = 0
+        for index in random.sample(range(height * width), mines):
+            self.mines.add(self.grid.cell(index))
+            self.mine_mask |= 1 << index
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +87,7 @@ class Minesweeper:
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -49,8 +95,7 @@ class Minesweeper:
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return bool(self.mine_mask >> self.grid.index(cell) & 1)
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +103,8 @@ class Minesweeper:
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        neighbors = self.grid.neighbors[self.grid.index(cell)]
+        return (self.mine_mask & neighbors).bit_count()
 
     def won(self):
         """
@@ -87,58 +116,137 @@ class Minesweeper:
 class Sentence:
     """
     Logical statement about a Minesweeper game
-    A sentence consists of a set of board cells,
+    A sentence consists of a bitset of board cells,
     and a count of the number of those cells which are mines.
     """
 
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        self.cells = cells
         self.count = count
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __len__(self):
+        return self.cells.bit_count()
+
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{list(bits(self.cells))} = {self.count}"
 
     def known_mines(self):
         """
-        Returns the set of all cells in self.cells known to be mines.
+        Returns the bitset of all cells in self.cells known to be mines.
         """
-        # Return set of cells if all cells are known to be mines
-        if len(self.cells) == self.count:
+        # Return all cells if all cells are known to be mines
+        if len(self) == self.count:
             return self.cells
         else:
-            return set()
+            return 0
 
     def known_safes(self):
         """
-        Returns the set of all cells in self.cells known to be safe.
+        Returns the bitset of all cells in self.cells known to be safe.
         """
-        # Return set of cells if all cells are known to be safe
+        # Return all cells if all cells are known to be safe
         if self.count == 0:
             return self.cells
         else:
-            return set()
+            return 0
 
-    def mark_mine(self, cell):
+    def mark_mine(self, index):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
+        the cell numbered `index` is known to be a mine.
         """
         # If the given cell is in the sentence, then update knowledge accordingly
-        if cell in self.cells:
-            self.cells.remove(cell)
+        if self.cells >> index & 1:
+            self.cells ^= 1 << index
             self.count -= 1
 
-    def mark_safe(self, cell):
+    def mark_safe(self, index):
         """
         Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
+        the cell numbered `index` is known to be safe.
         """
         # If the given cell is in the sentence, then update knowledge accordingly
-        if cell in self.cells:
-            self.cells.remove(cell)
+        if self.cells >> index & 1:
+            self.cells ^= 1 << index
+
+
+class KnowledgeBase:
+    """
+    Collection of sentences about a Minesweeper game,
+    indexed by the cells that each sentence mentions.
+    """
+
+    def __init__(self):
+
+        # Map each bitset of cells to the one sentence about those cells
+        self.sentences = dict()
+
+        # Map each cell number to the bitsets of all sentences mentioning it
+        self.index = dict()
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it is empty
+        or there is already a sentence about the same cells.
+        Returns True if the sentence was added.
+        """
+        key = sentence.cells
+        if not key or key in self.sentences:
+            return False
+        self.sentences[key] = sentence
+        for index in bits(key):
+            self.index.setdefault(index, set()).add(key)
+        return True
+
+    def remove(self, key):
+        """
+        Removes and returns the sentence about the cells in bitset `key`.
+        """
+        sentence = self.sentences.pop(key)
+        for index in bits(key):
+            keys = self.index.get(index)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.index[index]
+        return sentence
+
+    def mark(self, index, mine):
+        """
+        Updates every sentence mentioning the cell numbered `index` given
+        the fact that it is a mine (or safe, if `mine` is False).
+        Returns the list of updated sentences still in the knowledge base.
+        """
+        updated = []
+        for key in self.index.pop(index, set()):
+            sentence = self.remove(key)
+            if mine:
+                sentence.mark_mine(index)
+            else:
+                sentence.mark_safe(index)
+            if self.add(sentence):
+                updated.append(sentence)
+        return updated
+
+    def overlapping(self, sentence):
+        """
+        Returns the list of other sentences sharing at least one cell
+        with `sentence`.
+        """
+        keys = set()
+        for index in bits(sentence.cells):
+            keys.update(self.index.get(index, ()))
+        keys.discard(sentence.cells)
+        return [self.sentences[key] for key in keys]
 
 
 class MinesweeperAI:
@@ -146,39 +254,70 @@ class MinesweeperAI:
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Largest group of linked cells whose mine layouts are enumerated exactly
+    MAX_COMPONENT = 500
+
+    def __init__(self, height=8, width=8, mines=None, time_budget=1.0):
 
         # Set initial height and width
         self.height = height
         self.width = width
+        self.grid = Grid(height, width)
+
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
+        # Seconds allowed for estimating mine probabilities on a random move
+        self.time_budget = time_budget
+
+        # Cache of mine layout counts for each group of linked sentences
+        self.layouts = dict()
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
-        # Keep track of cells known to be safe or mines
+        # Keep track of cells known to be safe or mines,
+        # both as sets of cells and as bitsets
         self.mines = set()
         self.safes = set()
+        self.mine_mask = 0
+        self.safe_mask = 0
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Keep track of safe cells not yet clicked on
+        self.safe_moves = set()
+
+        # Keep numbers of cells neither clicked on nor known to be mines,
+        # with each one's position in the list for constant time removal
+        self.candidates = list(range(height * width))
+        self.positions = {index: index for index in self.candidates}
+
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase()
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
+        Returns the list of sentences that were updated.
         """
+        index = self.grid.index(cell)
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.mine_mask |= 1 << index
+        self.remove_candidate(index)
+        return self.knowledge.mark(index, mine=True)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
+        Returns the list of sentences that were updated.
         """
+        index = self.grid.index(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.safe_mask |= 1 << index
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        return self.knowledge.mark(index, mine=False)
 
     def add_knowledge(self, cell, count):
         """
@@ -197,53 +336,84 @@ class MinesweeperAI:
         """
         # 1) Mark the cell as a move that has been made
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
+        self.remove_candidate(self.grid.index(cell))
         # 2) Mark the cell as safe
         self.mark_safe(cell)
 
-        # 3) Add a new sentence to the AI's knowledge base
-        neighbors = set()
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
+        # 3) Add a new sentence to the AI's knowledge base,
+        # leaving out neighbors already known to be safe or mines
+        neighbors = self.grid.neighbors[self.grid.index(cell)]
+        count -= (neighbors & self.mine_mask).bit_count()
+        neighbors &= ~(self.mine_mask | self.safe_mask)
+        sentence = Sentence(neighbors, count)
+        self.knowledge.add(sentence)
+
+        # 4) and 5) Mark cells and infer new sentences until nothing new is learned
+        self.propagate([sentence])
 
-                # Ignore the cell itself
-                if (i, j) == cell:
+    def propagate(self, sentences):
+        """
+        Draws every conclusion that follows from `sentences`, revisiting
+        only the sentences affected by each new conclusion, until
+        the knowledge base reaches a fixpoint.
+        """
+        queue = deque(sentences)
+        queued = set(id(sentence) for sentence in queue)
+
+        def enqueue(sentences):
+            for sentence in sentences:
+                if id(sentence) not in queued:
+                    queued.add(id(sentence))
+                    queue.append(sentence)
+
+        while queue:
+            sentence = queue.popleft()
+            queued.discard(id(sentence))
+
+            # Skip sentences dropped from the knowledge base since being queued
+            if self.knowledge.sentences.get(sentence.cells) is not sentence:
+                continue
+
+            # Mark any cells known to be safe or mines
+            safes = sentence.known_safes()
+            mines = sentence.known_mines()
+            for safe in self.grid.cells(safes):
+                enqueue(self.mark_safe(safe))
+            for mine in self.grid.cells(mines):
+                enqueue(self.mark_mine(mine))
+            if safes or mines:
+                continue
+
+            # Infer new sentences from overlapping sentences that are subsets
+            # or supersets of this one
+            for other in self.knowledge.overlapping(sentence):
+                common = sentence.cells & other.cells
+                if common == other.cells:
+                    new_sentence = Sentence(
+                        sentence.cells ^ common, sentence.count - other.count
+                    )
+                elif common == sentence.cells:
+                    new_sentence = Sentence(
+                        other.cells ^ common, other.count - sentence.count
+                    )
+                else:
                     continue
+                if self.knowledge.add(new_sentence):
+                    enqueue([new_sentence])
 
-                # Update neighbors if cell in bounds
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if (i, j) in self.safes:
-                        continue
-                    elif (i, j) in self.mines:
-                        count -= 1
-                    else:
-                        neighbors.add((i, j))
-        self.knowledge.append(Sentence(neighbors, count))
-
-        # 4) Mark any additional cells as safe or as mines
-        for sentence in self.knowledge.copy():
-            for safe in sentence.known_safes().copy():
-                if safe not in self.safes:
-                    self.mark_safe(safe)
-            for mine in sentence.known_mines().copy():
-                if mine not in self.mines:
-                    self.mark_mine(mine)
-
-        # 5) Add any new sentences to the AI's knowledge base
-        for sentence1 in self.knowledge.copy():
-            for sentence2 in self.knowledge.copy():
-                if sentence1.cells != sentence2.cells and sentence2.cells.issubset(
-                    sentence1.cells
-                ):
-                    new_cells = sentence1.cells.difference(sentence2.cells)
-                    new_count = sentence1.count - sentence2.count
-                    new_sentence = Sentence(new_cells, new_count)
-                    self.knowledge.append(new_sentence)
-                    for safe in new_sentence.known_safes().copy():
-                        if safe not in self.safes:
-                            self.mark_safe(safe)
-                    for mine in new_sentence.known_mines().copy():
-                        if mine not in self.mines:
-                            self.mark_mine(mine)
+    def remove_candidate(self, index):
+        """
+        Removes the cell numbered `index` from the candidates for a move,
+        by moving the last candidate into its place.
+        """
+        position = self.positions.pop(index, None)
+        if position is None:
+            return
+        last = self.candidates.pop()
+        if last != index:
+            self.candidates[position] = last
+            self.positions[last] = position
 
     def make_safe_move(self):
         """
@@ -254,17 +424,8 @@ class MinesweeperAI:
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        safe_moves = []
-        # Check for safe moves
-        for i in range(self.height):
-            for j in range(self.width):
-                move = (i, j)
-                if move not in self.moves_made and move in self.safes:
-                    safe_moves.append(move)
-        if safe_moves == []:
-            return None
-        else:
-            return safe_moves[0]
+        # Any safe cell not yet clicked on will do
+        return next(iter(self.safe_moves), None)
 
     def make_random_move(self):
         """
@@ -272,15 +433,230 @@ class MinesweeperAI:
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        Among those cells, picks one that is least likely to be a mine,
+        breaking ties at random.
         """
-        possible_moves = []
-        # Check for possible moves
-        for i in range(self.height):
-            for j in range(self.width):
-                move = (i, j)
-                if move not in self.moves_made and move not in self.mines:
-                    possible_moves.append(move)
-        if possible_moves == []:
+        if not self.candidates:
             return None
+        if self.safe_moves:
+            return self.make_safe_move()
+
+        # Find the cells mentioned by the knowledge base least likely to be mines
+        probabilities, other = self.mine_probabilities()
+        best_moves = []
+        if probabilities:
+            lowest = min(probabilities.values())
+            best_moves = [cell for cell, p in probabilities.items() if p == lowest]
+        if other is None or (best_moves and lowest < other):
+            return best_moves[random.randint(0, len(best_moves) - 1)]
+
+        # Otherwise pick one of the other cells, if they are at least as likely
+        others = len(self.candidates) - len(self.knowledge.index)
+        if best_moves and lowest == other:
+            if random.randint(0, others + len(best_moves) - 1) >= others:
+                return best_moves[random.randint(0, len(best_moves) - 1)]
+        while True:
+            index = self.candidates[random.randint(0, len(self.candidates) - 1)]
+            if index not in self.knowledge.index:
+                return self.grid.cell(index)
+
+    def mine_probabilities(self):
+        """
+        Returns a tuple `(probabilities, other)`, where `probabilities` maps
+        each cell mentioned by the AI's knowledge base to the probability
+        that it is a mine, and `other` is the probability that any other
+        cell neither clicked on nor known to be safe or a mine is a mine
+        (None if there are no such cells).
+
+        The sentences are split into groups that share no cells, and every
+        mine layout consistent with each group is counted. Layouts are
+        weighted by the number of ways the remaining mines can be placed
+        among the cells no sentence mentions. Groups that cannot be counted
+        within `self.time_budget` fall back to the average density of the
+        sentences mentioning each cell.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        probabilities = dict()
+        remaining = None
+        if self.total_mines is not None:
+            remaining = self.total_mines - len(self.mines)
+
+        # Count the mine layouts of each group of linked sentences,
+        # reusing counts for groups unchanged since the last random move
+        counted = []
+        cache = dict()
+        for component in self.components():
+            key = frozenset((s.cells, s.count) for s in component)
+            layouts = self.layouts.get(key)
+            if layouts is None:
+                layouts = self.count_layouts(component, deadline)
+            if layouts is not None:
+                cache[key] = layouts
+                counted.append(layouts)
+            else:
+                # Estimate probabilities from the density of each sentence
+                for cell, p in self.estimate_probabilities(component).items():
+                    probabilities[cell] = p
+                    if remaining is not None:
+                        remaining -= p
+        self.layouts = cache
+
+        # Combine groups weighted by placements of the remaining mines
+        # among the cells not mentioned by any sentence
+        others = len(self.candidates) - len(self.knowledge.index) - len(self.safe_moves)
+        if remaining is not None:
+            remaining = max(round(remaining), 0)
+        totals = [{k: n for k, (n, _) in layouts.items()} for _, layouts in counted]
+        placements = combine(totals)
+
+        def weight(mines, extra=0):
+            return ways(others - extra, remaining, mines + extra)
+
+        total = sum(n * weight(k) for k, n in placements.items())
+
+        for n, (group, layouts) in enumerate(counted):
+            rest = combine(totals[:n] + totals[n + 1:])
+            for k, (_, mine_counts) in layouts.items():
+                for m, count in rest.items():
+                    w = count * weight(k + m)
+                    for cell, mines in zip(group, mine_counts):
+                        probabilities[cell] = probabilities.get(cell, 0) + mines * w
+            for cell in group:
+                probabilities[cell] = probabilities.get(cell, 0) / total if total else 1
+
+        # Every cell outside the groups is equally likely to be a mine
+        if others == 0:
+            other = None
+        elif remaining is None:
+            other = 0.5
         else:
-            return possible_moves[random.randint(0, len(possible_moves) - 1)]
+            other = sum(
+                n * weight(k, extra=1) for k, n in placements.items()
+            ) / total if total else 1
+
+        return {self.grid.cell(cell): p for cell, p in probabilities.items()}, other
+
+    def components(self):
+        """
+        Returns the sentences in the knowledge base split into groups,
+        such that sentences in different groups share no cells.
+        """
+        components = []
+        seen = set()
+        for sentence in self.knowledge:
+            if id(sentence) in seen:
+                continue
+            seen.add(id(sentence))
+            component = [sentence]
+            stack = [sentence]
+            while stack:
+                for other in self.knowledge.overlapping(stack.pop()):
+                    if id(other) not in seen:
+                        seen.add(id(other))
+                        component.append(other)
+                        stack.append(other)
+            components.append(component)
+        return components
+
+    def count_layouts(self, sentences, deadline):
+        """
+        Counts the mine layouts of the cells in `sentences` that satisfy
+        every sentence, using backtracking search.
+
+        Returns a tuple `(cells, layouts)` where `cells` lists the numbers of
+        the cells, and `layouts` maps each number of mines k to a pair
+        `(n, mine_counts)`: the number n of layouts with k mines, and for
+        each cell the number of those layouts in which it is a mine.
+        Returns None if `deadline` passes before counting ends.
+        """
+        # Order cells so that each sentence is completed as early as possible
+        cells = []
+        seen = 0
+        for sentence in sentences:
+            cells.extend(bits(sentence.cells & ~seen))
+            seen |= sentence.cells
+        if len(cells) > self.MAX_COMPONENT:
+            return None
+        position = {cell: n for n, cell in enumerate(cells)}
+        constrains = [[] for _ in cells]
+        need = []
+        left = []
+        for n, sentence in enumerate(sentences):
+            for cell in bits(sentence.cells):
+                constrains[position[cell]].append(n)
+            need.append(sentence.count)
+            left.append(len(sentence))
+
+        layouts = dict()
+        assignment = [0] * len(cells)
+
+        def backtrack(n, mines):
+            if time.perf_counter() > deadline:
+                raise TimeoutError
+            if n == len(cells):
+                count, mine_counts = layouts.get(mines, (0, [0] * len(cells)))
+                for m, value in enumerate(assignment):
+                    mine_counts[m] += value
+                layouts[mines] = (count + 1, mine_counts)
+                return
+            for value in (0, 1):
+                consistent = True
+                for c in constrains[n]:
+                    need[c] -= value
+                    left[c] -= 1
+                    if need[c] < 0 or need[c] > left[c]:
+                        consistent = False
+                if consistent:
+                    assignment[n] = value
+                    backtrack(n + 1, mines + value)
+                for c in constrains[n]:
+                    need[c] += value
+                    left[c] += 1
+            assignment[n] = 0
+
+        try:
+            backtrack(0, 0)
+        except TimeoutError:
+            return None
+        return cells, layouts
+
+    def estimate_probabilities(self, sentences):
+        """
+        Returns a dictionary mapping the number of each cell in `sentences`
+        to the average mine density of the sentences mentioning it.
+        """
+        densities = dict()
+        for sentence in sentences:
+            for cell in bits(sentence.cells):
+                densities.setdefault(cell, []).append(sentence.count / len(sentence))
+        return {cell: sum(d) / len(d) for cell, d in densities.items()}
+
+
+def combine(distributions):
+    """
+    Returns the distribution of the total number of mines over several
+    groups of cells, given for each group a dictionary mapping a number
+    of mines to the number of layouts with that many mines.
+    """
+    combined = {0: 1}
+    for distribution in distributions:
+        result = dict()
+        for k1, n1 in combined.items():
+            for k2, n2 in distribution.items():
+                result[k1 + k2] = result.get(k1 + k2, 0) + n1 * n2
+        combined = result
+    return combined
+
+
+def ways(cells, remaining, mines):
+    """
+    Returns the number of ways to place the mines left over after `mines`
+    are placed among `cells` further cells, given `remaining` mines in total.
+    If the number of mines is unknown, every layout counts once.
+    """
+    if remaining is None:
+        return 1
+    if mines > remaining or remaining - mines > cells:
+        return 0
+    return math.comb(cells, remaining - mines)
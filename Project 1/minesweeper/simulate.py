@@ -0,0 +1,105 @@
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [5, 6]:
+        sys.exit("Usage: python simulate.py games height width mines [seed]")
+    games, height, width, mines = (int(arg) for arg in sys.argv[1:5])
+    seed = int(sys.argv[5]) if len(sys.argv) == 6 else 0
+
+    # Play games and print results
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, seed=seed)
+    elapsed = time.perf_counter() - start
+    report(results, elapsed)
+
+
+def simulate(games, height, width, mines, seed=0, ai=MinesweeperAI, processes=None):
+    """
+    Play `games` games of Minesweeper on a `height` x `width` board with
+    `mines` mines, letting an instance of class `ai` make every move.
+    Game n is seeded with `seed + n`, so results are reproducible
+    no matter how games are spread across worker processes.
+
+    Return a list with the result of each game, as returned by `play`.
+    """
+    tasks = [(height, width, mines, seed + n, ai) for n in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.starmap(play, tasks)
+
+
+def play(height, width, mines, seed, ai=MinesweeperAI):
+    """
+    Play one game of Minesweeper with the given AI, seeding the random
+    number generator with `seed` first.
+
+    Return a dictionary with whether the game was `won`, the seconds
+    taken to choose each move (`latencies`) and the number of sentences
+    in the knowledge base after each move (`knowledge`).
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    player = ai(height=height, width=width, mines=mines)
+    revealed = 0
+    latencies = []
+    knowledge = []
+
+    while True:
+
+        # Time how long the AI takes to choose its move
+        start = time.perf_counter()
+        move = player.make_safe_move()
+        if move is None:
+            move = player.make_random_move()
+        latencies.append(time.perf_counter() - start)
+
+        # Game is over if there are no moves left or a mine was hit
+        if move is None or game.is_mine(move):
+            break
+        player.add_knowledge(move, game.nearby_mines(move))
+        knowledge.append(len(player.knowledge))
+        revealed += 1
+
+    return {
+        "won": revealed == height * width - mines,
+        "latencies": latencies,
+        "knowledge": knowledge
+    }
+
+
+def report(results, elapsed):
+    """
+    Print win rate, decision latency and knowledge base size
+    over a list of game results.
+    """
+    games = len(results)
+    wins = sum(result["won"] for result in results)
+    latencies = [latency for result in results for latency in result["latencies"]]
+    print(f"Games: {games}")
+    print(f"Win rate: {wins / games:.2%}")
+    print(f"Moves: {len(latencies)} ({len(latencies) / elapsed:.1f} per second)")
+    print(f"Average decision latency: {sum(latencies) / len(latencies) * 1000:.3f} ms")
+
+    # Average knowledge base size across the games still going at each move
+    longest = max(len(result["knowledge"]) for result in results)
+    if longest == 0:
+        return
+    print("Knowledge base size:")
+    for move in sorted(set(range(0, longest, max(longest // 10, 1))) | {longest - 1}):
+        sizes = [
+            result["knowledge"][move] for result in results
+            if move < len(result["knowledge"])
+        ]
+        if sizes:
+            print(f"  Move {move + 1}: {sum(sizes) / len(sizes):.1f} sentences")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+
+from heredity import METHODS, compute_probabilities, load_data
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py directory|pattern [method] [processes]")
+    files = family_files(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else METHODS[0]
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    if method not in METHODS:
+        sys.exit(f"Unknown method: {method}")
+
+    # Print one line of JSON per family as soon as its results are ready
+    for filename, probabilities in batch(files, method, processes):
+        print(json.dumps({"file": filename, "probabilities": probabilities}), flush=True)
+
+
+def family_files(pattern):
+    """
+    Return the sorted list of CSV files in directory `pattern`,
+    or of files matching `pattern` if it is not a directory.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(glob.glob(pattern))
+
+
+def batch(files, method=METHODS[0], processes=None):
+    """
+    Compute gene and trait probabilities for the family in each of `files`
+    using `method`, in a pool of `processes` worker processes.
+
+    Families with the same structure and the same known traits are only
+    computed once. Yield a tuple `(filename, probabilities)` for each file,
+    in the order their results become ready.
+    """
+
+    # Group files by the shape of their family
+    families = dict()
+    for filename in files:
+        people = load_data(filename)
+        key, names = canonical(people)
+        if key not in families:
+            families[key] = (people, names, [])
+        families[key][2].append((filename, names))
+
+    # Compute one family of each shape, and share the results with the others
+    tasks = [(key, people, names, method) for key, (people, names, _) in families.items()]
+    with multiprocessing.Pool(processes) as pool:
+        for key, results in pool.imap_unordered(solve, tasks):
+            for filename, names in families[key][2]:
+                yield filename, dict(zip(names, results))
+
+
+def solve(task):
+    """
+    Compute probabilities for a `(key, people, names, method)` task.
+    Return the key, and the probabilities of each person in `names` order.
+    """
+    key, people, names, method = task
+    probabilities = compute_probabilities(people, method)
+    return key, [probabilities[name] for name in names]
+
+
+def canonical(people):
+    """
+    Return a tuple `(key, names)` describing the family in `people`
+    regardless of the names used.
+
+    People are ordered by a digest of their known trait and their ancestors,
+    then of their descendants, with names only breaking remaining ties.
+    `names` lists the people in that order, and `key` lists each one's
+    known trait and the positions of their parents.
+    Families with equal keys give the same probabilities, person by person.
+    """
+    children = {person: [] for person in people}
+    for person in people:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent:
+                children[parent].append(person)
+
+    def digest(*parts):
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    up = dict()
+
+    def ancestry(person):
+        if person not in up:
+            parents = [
+                ancestry(parent)
+                for parent in (people[person]["mother"], people[person]["father"])
+                if parent
+            ]
+            up[person] = digest(people[person]["trait"], sorted(parents))
+        return up[person]
+
+    down = dict()
+
+    def descent(person):
+        if person not in down:
+            below = [descent(child) for child in children[person]]
+            down[person] = digest(ancestry(person), sorted(below))
+        return down[person]
+
+    names = sorted(people, key=lambda person: (ancestry(person), descent(person), person))
+    position = {person: n for n, person in enumerate(names)}
+    key = tuple(
+        (
+            people[person]["trait"],
+            tuple(sorted(
+                position[parent]
+                for parent in (people[person]["mother"], people[person]["father"])
+                if parent
+            ))
+        )
+        for person in names
+    )
+    return key, names
+
+
+if __name__ == "__main__":
+    main()
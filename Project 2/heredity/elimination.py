@@ -0,0 +1,243 @@
+import heapq
+import itertools
+
+from heredity import GENE, INHERITANCE, TRAIT
+
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    Nonnegative function of the number of gene copies of some people,
+    stored as a table mapping each tuple of gene counts (one per person
+    in `variables`, in order) to a value.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other):
+        """
+        Return the product of this factor and `other`.
+        """
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = dict()
+        for assignment in itertools.product(GENES, repeat=len(variables)):
+            table[assignment] = (
+                self.table[tuple(assignment[i] for i in mine)] *
+                other.table[tuple(assignment[i] for i in theirs)]
+            )
+        return Factor(variables, table)
+
+    def sum_out(self, variable):
+        """
+        Return this factor with `variable` summed out.
+        """
+        position = self.variables.index(variable)
+        variables = self.variables[:position] + self.variables[position + 1:]
+        table = dict()
+        for assignment, value in self.table.items():
+            key = assignment[:position] + assignment[position + 1:]
+            table[key] = table.get(key, 0) + value
+        return Factor(variables, table)
+
+    def divide(self, other):
+        """
+        Return this factor divided by `other`, whose variables must all be
+        variables of this factor, taking 0 / 0 to be 0.
+        """
+        theirs = [self.variables.index(v) for v in other.variables]
+        table = dict()
+        for assignment, value in self.table.items():
+            divisor = other.table[tuple(assignment[i] for i in theirs)]
+            table[assignment] = value / divisor if divisor else 0
+        return Factor(self.variables, table)
+
+    def marginal(self, variables):
+        """
+        Return this factor with every variable not in `variables` summed out.
+        """
+        factor = self
+        for variable in self.variables:
+            if variable not in variables:
+                factor = factor.sum_out(variable)
+        return factor
+
+    def normalize(self):
+        """
+        Return this factor scaled so that its values sum to 1.
+        """
+        total = sum(self.table.values())
+        return Factor(self.variables, {
+            assignment: value / total for assignment, value in self.table.items()
+        })
+
+
+def factors(people):
+    """
+    Return the list of factors of the Bayesian network for `people`:
+    one per person, giving the probability of their gene count
+    given their parents' gene counts, times the probability of their
+    trait if it is known.
+    """
+    result = []
+    for person in people:
+        trait = people[person]["trait"]
+        mother, father = people[person]["mother"], people[person]["father"]
+
+        def evidence(gene):
+            return 1 if trait is None else TRAIT[gene][trait]
+
+        # Person without parents in the dataset
+        if not (mother and father):
+            table = {
+                (gene,): GENE[gene] * evidence(gene) for gene in GENES
+            }
+            result.append(Factor([person], table))
+            continue
+
+        # Person inheriting one copy from each parent
+        table = dict()
+        for gene, mother_gene, father_gene in itertools.product(GENES, repeat=3):
+            table[gene, mother_gene, father_gene] = (
+                INHERITANCE[gene][mother_gene][father_gene] * evidence(gene)
+            )
+        result.append(Factor([person, mother, father], table))
+    return result
+
+
+def min_fill_order(factors, variables):
+    """
+    Return an order in which to eliminate `variables` from `factors`,
+    choosing next the variable whose elimination connects the fewest
+    pairs of not yet connected variables (ties broken by fewest neighbors).
+    """
+    neighbors = interaction_graph(factors)
+
+    def score(v):
+        fill = sum(
+            1 for a, b in itertools.combinations(neighbors[v], 2)
+            if b not in neighbors[a]
+        )
+        return (fill, len(neighbors[v]), v)
+
+    # Keep a heap of scores, skipping entries made stale by an elimination
+    scores = {v: score(v) for v in variables}
+    heap = list(scores.values())
+    heapq.heapify(heap)
+
+    order = []
+    while heap:
+        entry = heapq.heappop(heap)
+        v = entry[-1]
+        if scores.get(v) != entry:
+            continue
+        del scores[v]
+        order.append(v)
+
+        # Connect the neighbors of v, and remove v from the graph
+        for a, b in itertools.combinations(neighbors[v], 2):
+            neighbors[a].add(b)
+            neighbors[b].add(a)
+        affected = neighbors.pop(v)
+        for a in affected:
+            neighbors[a].discard(v)
+
+        # Only variables within two steps of v can have a new score
+        for a in set().union(affected, *(neighbors[a] for a in affected)):
+            if a in scores:
+                scores[a] = score(a)
+                heapq.heappush(heap, scores[a])
+    return order
+
+
+def interaction_graph(factors):
+    """
+    Return a dictionary mapping each variable of `factors` to the set of
+    other variables it shares a factor with.
+    """
+    neighbors = dict()
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+    for v in neighbors:
+        neighbors[v].discard(v)
+    return neighbors
+
+
+def eliminate(factors, order):
+    """
+    Sum out each variable in `order` from the product of `factors`, in turn.
+    Return the list of remaining factors, each known only up to a constant.
+    """
+    factors = list(factors)
+    for variable in order:
+        involved = [f for f in factors if variable in f.variables]
+        factors = [f for f in factors if variable not in f.variables]
+        if not involved:
+            continue
+        product = involved[0]
+        for factor in involved[1:]:
+            product = product.multiply(factor)
+
+        # Rescale each new factor so that long products do not underflow
+        factors.append(product.sum_out(variable).normalize())
+    return factors
+
+
+def gene_distribution(people, person, network=None):
+    """
+    Return a dictionary mapping each gene count to the probability
+    that `person` has that many copies, given the known traits.
+    """
+    network = network or factors(people)
+    others = [p for p in people if p != person]
+    remaining = eliminate(network, min_fill_order(network, others))
+    distribution = {gene: 1 for gene in GENES}
+    for factor in remaining:
+
+        # Factors of no variables are constants, cancelled by normalizing
+        if not factor.variables:
+            continue
+        factor = factor.normalize()
+        for gene in GENES:
+            distribution[gene] *= factor.table[(gene,)]
+    total = sum(distribution.values())
+    return {gene: distribution[gene] / total for gene in distribution}
+
+
+def infer(people):
+    """
+    Return gene and trait probabilities for each person, in the same form
+    as computed by `heredity.main`, using variable elimination.
+    """
+    network = factors(people)
+    return distributions(people, {
+        person: gene_distribution(people, person, network) for person in people
+    })
+
+
+def distributions(people, genes):
+    """
+    Return gene and trait probabilities for each person, in the same form
+    as computed by `heredity.main`, given `genes` mapping each person
+    to the distribution of their gene count.
+    """
+    probabilities = dict()
+    for person in people:
+        trait = people[person]["trait"]
+        if trait is None:
+            p = sum(genes[person][gene] * TRAIT[gene][True] for gene in GENES)
+            traits = {True: p, False: 1 - p}
+        else:
+            traits = {True: 1 if trait else 0, False: 0 if trait else 1}
+        probabilities[person] = {
+            "gene": {gene: genes[person][gene] for gene in (2, 1, 0)},
+            "trait": traits
+        }
+    return probabilities
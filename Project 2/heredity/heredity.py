@@ -1,5 +1,6 @@
 import csv
 import itertools
+import math
 import sys
 
 PROBS = {
@@ -36,13 +37,91 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Probability that a parent with 0, 1 or 2 copies of the gene passes one on
+PASS = [PROBS["mutation"], 0.5, 1 - PROBS["mutation"]]
+
+# INHERITANCE[gene][mother_gene][father_gene] is the probability that a child
+# has `gene` copies of the gene, given the number of copies of each parent
+INHERITANCE = [
+    [
+        [
+            [(1 - m) * (1 - f), m * (1 - f) + (1 - m) * f, m * f][gene]
+            for f in PASS
+        ]
+        for m in PASS
+    ]
+    for gene in range(3)
+]
+
+# GENE[gene] is the probability of having `gene` copies with no known parents
+GENE = [PROBS["gene"][gene] for gene in range(3)]
+
+# TRAIT[gene][trait] is the probability of having the trait (if `trait` is
+# True) or not (if `trait` is False), given `gene` copies of the gene
+TRAIT = [[PROBS["trait"][gene][False], PROBS["trait"][gene][True]] for gene in range(3)]
+
+# Natural logarithms of the tables above, with log(0) taken to be -inf,
+# so that long products can be computed as sums without underflowing
+LOG_INHERITANCE = [
+    [[math.log(p) if p > 0 else -math.inf for p in row] for row in table]
+    for table in INHERITANCE
+]
+LOG_GENE = [math.log(p) if p > 0 else -math.inf for p in GENE]
+LOG_TRAIT = [[math.log(p) if p > 0 else -math.inf for p in row] for row in TRAIT]
+
+
+# Ways of computing gene and trait probabilities, the first being the default
+METHODS = ["enumerate", "vectorize", "eliminate", "junction", "weighting", "gibbs"]
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3] or (len(sys.argv) == 3 and sys.argv[2] not in METHODS):
+        sys.exit(f"Usage: python heredity.py data.csv [{'|'.join(METHODS)}]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else METHODS[0]
+
+    # Compute gene and trait probabilities for each person
+    probabilities = compute_probabilities(people, method)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def compute_probabilities(people, method=METHODS[0]):
+    """
+    Compute gene and trait probabilities for each person using `method`,
+    one of `METHODS`.
+    """
+    if method == "enumerate":
+        return enumerate_probabilities(people)
+    elif method == "vectorize":
+        return vectorized_probabilities(people)
+    elif method == "eliminate":
+        from elimination import infer
+        return infer(people)
+    elif method == "junction":
+        from junction import infer
+        return infer(people)
+    elif method in ("weighting", "gibbs"):
+        from sampling import sample
+        return sample(people, method)[0]
+    raise ValueError(f"unknown method: {method}")
+
+
+def enumerate_probabilities(people):
+    """
+    Compute gene and trait probabilities for each person by summing
+    the joint probability of every possible assignment of genes
+    consistent with the known traits.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -60,38 +139,142 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Sum probabilities scaled by the largest joint probability so far,
+    # rescaling the sums whenever a larger one comes along
+    shift = -math.inf
+    for genes, log_p in assignments(people):
+        if log_p > shift:
+            scale = math.exp(shift - log_p)
+            for person in probabilities:
+                for field in probabilities[person]:
+                    for value in probabilities[person][field]:
+                        probabilities[person][field][value] *= scale
+            shift = log_p
+        p = math.exp(log_p - shift)
+        for person in people:
+            gene = genes[person]
+            trait = people[person]["trait"]
+            probabilities[person]["gene"][gene] += p
+
+            # Unknown traits are summed out given the gene
+            if trait is None:
+                for value in (True, False):
+                    probabilities[person]["trait"][value] += p * TRAIT[gene][value]
+            else:
+                probabilities[person]["trait"][trait] += p
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
+def vectorized_probabilities(people, batch_size=3 ** 10):
+    """
+    Compute gene and trait probabilities for each person like
+    `enumerate_probabilities`, evaluating the joint probabilities of
+    `batch_size` gene assignments at a time with NumPy.
+    """
+    import numpy as np
+
+    names = list(people)
+    n = len(names)
+
+    # Known traits are fixed, unknown traits are left out of the product
+    observed = np.array([
+        -1 if people[person]["trait"] is None else int(people[person]["trait"])
+        for person in names
+    ], dtype=int)
+
+    # Number each assignment of genes, reading its digits in base 3
+    powers = 3 ** np.arange(n)
+    genes = np.zeros((n, 3))
+    shift = -np.inf
+    for start in range(0, 3 ** n, batch_size):
+        batch = np.arange(start, min(start + batch_size, 3 ** n))[:, None] // powers % 3
+        log_p = log_joint_probabilities(
+            people, batch, np.broadcast_to(observed, batch.shape)
         )
-        if fails_evidence:
+
+        # Sum probabilities scaled by the largest joint probability so far
+        if log_p.max() == -np.inf:
             continue
+        if log_p.max() > shift:
+            genes *= np.exp(shift - log_p.max())
+            shift = log_p.max()
+        p = np.exp(log_p - shift)
+        for gene in range(3):
+            genes[:, gene] += p @ (batch == gene)
+
+    # Traits follow from the gene distribution of each person
+    genes /= genes.sum(axis=1, keepdims=True)
+    probabilities = dict()
+    for person, distribution, trait in zip(names, genes, observed):
+        if trait == -1:
+            p = sum(distribution[gene] * TRAIT[gene][True] for gene in range(3))
+        else:
+            p = float(trait)
+        probabilities[person] = {
+            "gene": {gene: float(distribution[gene]) for gene in (2, 1, 0)},
+            "trait": {True: p, False: 1 - p}
+        }
+    return probabilities
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def assignments(people):
+    """
+    Yield every assignment of gene counts to `people`, as tuples
+    `(genes, log_p)` where `genes` maps each person to their number of copies
+    of the gene, and `log_p` is the natural logarithm of the joint
+    probability of those genes and the known traits.
+    The `genes` dictionary is reused, so it must not be kept between steps.
+
+    People are assigned parents first, so that the sum of the log factors of
+    the people assigned so far is shared by every assignment extending it.
+    """
+    order = ancestral_order(people)
+    genes = dict()
+
+    def extend(n, log_p):
+        if n == len(order):
+            yield genes, log_p
+            return
+        person = order[n]
+        mother, father = people[person]["mother"], people[person]["father"]
+        trait = people[person]["trait"]
+        for gene in (0, 1, 2):
+            if mother and father:
+                factor = LOG_INHERITANCE[gene][genes[mother]][genes[father]]
+            else:
+                factor = LOG_GENE[gene]
+            if trait is not None:
+                factor += LOG_TRAIT[gene][trait]
+            if factor == -math.inf:
+                continue
+            genes[person] = gene
+            yield from extend(n + 1, log_p + factor)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    yield from extend(0, 0)
+
+
+def ancestral_order(people):
+    """
+    Return a list of the names of `people` with parents before their children.
+    """
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent:
+                place(parent)
+        order.append(person)
 
-    # Print results
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        place(person)
+    return order
 
 
 def load_data(filename):
@@ -118,14 +301,13 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield all possible subsets of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -139,11 +321,20 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    probabilities = []
+    return math.exp(log_joint_probability(people, one_gene, two_genes, have_trait))
+
+
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute the natural logarithm of the joint probability computed by
+    `joint_probability`, as a sum of logarithms that does not underflow
+    however many people there are.
+    """
+    total = 0
 
     for person in people:
         gene = 1 if person in one_gene else 2 if person in two_genes else 0
-        trait = True if person in have_trait else False
+        trait = person in have_trait
 
         father, mother = people[person]["father"], people[person]["mother"]
 
@@ -151,63 +342,59 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         if father and mother:
             father_gene = 1 if father in one_gene else 2 if father in two_genes else 0
             mother_gene = 1 if mother in one_gene else 2 if mother in two_genes else 0
-            # Possible combinations for zero genes
-            if gene == 0:
-                if father_gene == 0 and mother_gene == 0:
-                    gene_probability = (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-                elif father_gene == 2 and mother_gene == 2:
-                    gene_probability = PROBS["mutation"] * PROBS["mutation"]
-                elif father_gene == 1 and mother_gene == 1:
-                    gene_probability = 0.5 * 0.5
-                elif (father_gene == 1 and mother_gene == 0) or (father_gene == 0 and mother_gene == 1):
-                    gene_probability = 0.5 * (1 - PROBS["mutation"])
-                elif (father_gene == 2 and mother_gene == 0) or (father_gene == 0 and mother_gene == 2):
-                    gene_probability = PROBS["mutation"] * (1 - PROBS["mutation"])
-                elif (father_gene == 2 and mother_gene == 1) or (father_gene == 1 and mother_gene == 2):
-                    gene_probability = 0.5 * PROBS["mutation"]
-            # Possible combinations for one gene
-            elif gene == 1:
-                if father_gene == 0 and mother_gene == 0:
-                    gene_probability = PROBS["mutation"] * (1 - PROBS["mutation"])
-                elif father_gene == 2 and mother_gene == 2:
-                    gene_probability = PROBS["mutation"] * (1 - PROBS["mutation"])
-                elif father_gene == 1 and mother_gene == 1:
-                    gene_probability = 0.5 * 0.5
-                elif (father_gene == 1 and mother_gene == 0) or (father_gene == 0 and mother_gene == 1):
-                    gene_probability = 0.5 * (1 - PROBS["mutation"])
-                elif (father_gene == 2 and mother_gene == 0) or (father_gene == 0 and mother_gene == 2):
-                    gene_probability = (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-                elif (father_gene == 2 and mother_gene == 1) or (father_gene == 1 and mother_gene == 2):
-                    gene_probability = (1 - PROBS["mutation"]) * 0.5
-            # Possible combinations for two genes
-            else:
-                if father_gene == 0 and mother_gene == 0:
-                    gene_probability = PROBS["mutation"] * PROBS["mutation"]
-                elif father_gene == 2 and mother_gene == 2:
-                    gene_probability = (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-                elif father_gene == 1 and mother_gene == 1:
-                    gene_probability = 0.5 * 0.5
-                elif (father_gene == 1 and mother_gene == 0) or (father_gene == 0 and mother_gene == 1):
-                    gene_probability = 0.5 * PROBS["mutation"]
-                elif (father_gene == 2 and mother_gene == 0) or (father_gene == 0 and mother_gene == 2):
-                    gene_probability = (1 - PROBS["mutation"]) * PROBS["mutation"]
-                elif (father_gene == 2 and mother_gene == 1) or (father_gene == 1 and mother_gene == 2):
-                    gene_probability = 0.5 * (1 - PROBS["mutation"])
-            
-            probability = gene_probability * PROBS["trait"][gene][trait]
-            probabilities.append(probability)
+            total += LOG_INHERITANCE[gene][mother_gene][father_gene]
 
         # If person has no parents in the dataset
-        else: 
-            probability = PROBS["gene"][gene] * PROBS["trait"][gene][trait]
-            probabilities.append(probability)
-    
-    product = 1
-    # Multiply all probabilities
-    for probability in probabilities:
-        product *= probability
-
-    return product
+        else:
+            total += LOG_GENE[gene]
+
+        total += LOG_TRAIT[gene][trait]
+
+    return total
+
+
+def joint_probabilities(people, genes, traits):
+    """
+    Compute the joint probabilities of a batch of assignments at once.
+
+    `genes` is an array with one row per assignment and one column per
+    person (in the order of `people`), giving their number of copies of
+    the gene. `traits` is an array of the same shape holding 1 if the
+    person has the trait, 0 if not, or -1 to leave the trait out of
+    the product. Return an array of joint probabilities, one per row.
+    """
+    import numpy as np
+
+    return np.exp(log_joint_probabilities(people, genes, traits))
+
+
+def log_joint_probabilities(people, genes, traits):
+    """
+    Compute the natural logarithms of the joint probabilities computed by
+    `joint_probabilities`, by summing logarithms from the tables.
+    """
+    import numpy as np
+
+    genes = np.asarray(genes)
+    traits = np.asarray(traits)
+    column = {person: n for n, person in enumerate(people)}
+    inheritance = np.array(LOG_INHERITANCE)
+    prior = np.array(LOG_GENE)
+
+    # A trait of -1 picks the last column, of log probability 0
+    trait = np.array([row + [0] for row in LOG_TRAIT])
+
+    total = np.zeros(len(genes))
+    for n, person in enumerate(people):
+        father, mother = people[person]["father"], people[person]["mother"]
+        if father and mother:
+            total += inheritance[
+                genes[:, n], genes[:, column[mother]], genes[:, column[father]]
+            ]
+        else:
+            total += prior[genes[:, n]]
+        total += trait[genes[:, n], traits[:, n]]
+    return total
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
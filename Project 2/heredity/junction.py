@@ -0,0 +1,176 @@
+import itertools
+
+from elimination import (
+    GENES, Factor, distributions, factors, interaction_graph, min_fill_order
+)
+
+# Largest clique, in people, for which a junction tree is built
+MAX_CLIQUE = 8
+
+
+def infer(people, max_clique=MAX_CLIQUE):
+    """
+    Return gene and trait probabilities for each person, in the same form
+    as computed by `heredity.main`.
+
+    Runs sum-product message passing on a junction tree of the pedigree,
+    or loopy belief propagation if the junction tree would need a clique
+    of more than `max_clique` people.
+    """
+    network = factors(people)
+    tree = junction_tree(network, list(people), max_clique)
+    if tree is None:
+        genes = loopy_belief_propagation(network)
+    else:
+        genes = calibrate(*tree)
+    return distributions(people, genes)
+
+
+def junction_tree(network, variables, max_clique=MAX_CLIQUE):
+    """
+    Build a junction tree for the factors in `network` by eliminating
+    `variables` in min-fill order.
+
+    Eliminating each variable creates one clique: the variable and its
+    neighbors at that point. The parent of that clique is the clique of
+    the neighbor eliminated next. Every factor is multiplied into the
+    clique of its first variable to be eliminated.
+
+    Return a tuple `(order, cliques, parents, potentials)` of lists with
+    one entry per clique (parents are clique indices, or None for roots),
+    or None if any clique would have more than `max_clique` variables.
+    """
+    order = min_fill_order(network, variables)
+    position = {v: n for n, v in enumerate(order)}
+    neighbors = interaction_graph(network)
+
+    cliques = []
+    parents = []
+    for v in order:
+        clique = (v,) + tuple(sorted(neighbors[v], key=position.get))
+        if len(clique) > max_clique:
+            return None
+        cliques.append(clique)
+        parents.append(position[clique[1]] if len(clique) > 1 else None)
+
+        # Connect the neighbors of v, and remove v from the graph
+        for a, b in itertools.combinations(neighbors[v], 2):
+            neighbors[a].add(b)
+            neighbors[b].add(a)
+        for a in neighbors.pop(v):
+            neighbors[a].discard(v)
+
+    # Multiply each factor into a clique containing all of its variables
+    potentials = [
+        Factor(clique, {
+            assignment: 1
+            for assignment in itertools.product(GENES, repeat=len(clique))
+        })
+        for clique in cliques
+    ]
+    for factor in network:
+        n = min(position[v] for v in factor.variables)
+        potentials[n] = potentials[n].multiply(factor)
+
+    return order, cliques, parents, potentials
+
+
+def calibrate(order, cliques, parents, potentials):
+    """
+    Pass messages up the junction tree from the leaves to the roots,
+    then back down, normalizing every message to avoid underflow.
+
+    Return a dictionary mapping each variable to its distribution.
+    """
+    # Children are eliminated before their parents, so cliques are
+    # already ordered from the leaves up
+    incoming = [list() for _ in cliques]
+    up = [None] * len(cliques)
+    for n, clique in enumerate(cliques):
+        belief = potentials[n]
+        for message in incoming[n]:
+            belief = belief.multiply(message)
+        if parents[n] is not None:
+            up[n] = belief.marginal(clique[1:]).normalize()
+            incoming[parents[n]].append(up[n])
+
+    # Send messages back down, dividing out each child's own message
+    beliefs = [None] * len(cliques)
+    for n in reversed(range(len(cliques))):
+        belief = potentials[n]
+        for message in incoming[n]:
+            belief = belief.multiply(message)
+        if parents[n] is not None:
+            parent = beliefs[parents[n]]
+            down = parent.divide(up[n]).marginal(cliques[n][1:]).normalize()
+            belief = belief.multiply(down)
+        beliefs[n] = belief
+
+    # Read each variable's distribution from the clique it was eliminated in
+    return {
+        v: {
+            gene: p for (gene,), p in
+            beliefs[n].marginal((v,)).normalize().table.items()
+        }
+        for n, v in enumerate(order)
+    }
+
+
+def loopy_belief_propagation(network, iterations=100, tolerance=1e-10):
+    """
+    Approximate the distribution of each variable in `network` by passing
+    messages between factors and variables until no message changes by
+    more than `tolerance`, or for at most `iterations` rounds.
+
+    Return a dictionary mapping each variable to its distribution.
+    """
+    uniform = [1 / len(GENES)] * len(GENES)
+    links = dict()
+    for n, factor in enumerate(network):
+        for v in factor.variables:
+            links.setdefault(v, []).append(n)
+    to_factor = {(n, v): uniform for v in links for n in links[v]}
+    to_variable = {(n, v): uniform for v in links for n in links[v]}
+
+    def normalize(message):
+        total = sum(message)
+        return [value / total for value in message]
+
+    for _ in range(iterations):
+
+        # Send messages from each factor to each of its variables
+        change = 0
+        for n, factor in enumerate(network):
+            for position, v in enumerate(factor.variables):
+                message = [0] * len(GENES)
+                for assignment, value in factor.table.items():
+                    for u, gene in zip(factor.variables, assignment):
+                        if u != v:
+                            value *= to_factor[n, u][gene]
+                    message[assignment[position]] += value
+                message = normalize(message)
+                change = max(
+                    change, max(abs(a - b) for a, b in zip(message, to_variable[n, v]))
+                )
+                to_variable[n, v] = message
+
+        # Send messages from each variable to each of its factors
+        for v in links:
+            for n in links[v]:
+                message = [1] * len(GENES)
+                for m in links[v]:
+                    if m != n:
+                        message = [a * b for a, b in zip(message, to_variable[m, v])]
+                to_factor[n, v] = normalize(message)
+
+        if change < tolerance:
+            break
+
+    # Each variable's belief is the product of all messages it receives
+    beliefs = dict()
+    for v in links:
+        belief = [1] * len(GENES)
+        for n in links[v]:
+            belief = normalize([a * b for a, b in zip(belief, to_variable[n, v])])
+        beliefs[v] = dict(zip(GENES, belief))
+    return beliefs
@@ -0,0 +1,232 @@
+import glob
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from elimination import distributions, infer
+from heredity import GENE, INHERITANCE, LOG_TRAIT, TRAIT, ancestral_order, load_data
+
+# Number of Gibbs chains run side by side in each process
+CHAINS = 100
+
+# Number of Gibbs sweeps discarded before samples are recorded
+BURN_IN = 100
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python sampling.py [samples] [seed] [processes]")
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    # Compare each sampler with exact inference on the bundled families
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    for filename in sorted(glob.glob(os.path.join(directory, "family*.csv"))):
+        people = load_data(filename)
+        exact = infer(people)
+        print(f"{os.path.basename(filename)}:")
+        for method in ("weighting", "gibbs"):
+            probabilities, ess = sample(people, method, samples, seed, processes)
+            error = max(
+                abs(probabilities[person][field][value] - exact[person][field][value])
+                for person in people
+                for field in exact[person]
+                for value in exact[person][field]
+            )
+            print(f"  {method.capitalize()}: error {error:.4f}, ESS {ess:.0f}")
+
+
+def sample(people, method="weighting", samples=10000, seed=0, processes=1):
+    """
+    Estimate gene and trait probabilities for each person, in the same form
+    as computed by `heredity.main`, from `samples` samples drawn either by
+    likelihood weighting (`method` "weighting") or Gibbs sampling ("gibbs").
+
+    Samples are split between `processes` independent runs, each seeded
+    from `seed`, and run in a process pool if there is more than one.
+    Return a tuple `(probabilities, ess)` where `ess` is the effective
+    sample size (the smallest over all people, for Gibbs sampling).
+    """
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    tasks = [
+        (people, method, samples // processes + (n < samples % processes), seeds[n])
+        for n in range(processes)
+    ]
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(run, tasks)
+    else:
+        results = [run(*tasks[0])]
+
+    # Combine gene counts and effective sample sizes from every run
+    if method == "weighting":
+
+        # Bring every run's weights to the scale of the largest weight
+        shift = max(result[1] for result in results)
+        scales = [np.exp(result[1] - shift) for result in results]
+        counts = sum(result[0] * scale for result, scale in zip(results, scales))
+        total = sum(result[2] * scale for result, scale in zip(results, scales))
+        squares = sum(result[3] * scale ** 2 for result, scale in zip(results, scales))
+        ess = total ** 2 / squares
+    else:
+        counts = sum(result[0] for result in results)
+        ess = sum(min(result[1]) for result in results)
+
+    counts /= counts.sum(axis=1, keepdims=True)
+    genes = {
+        person: {gene: float(counts[n, gene]) for gene in range(3)}
+        for n, person in enumerate(people)
+    }
+    return distributions(people, genes), ess
+
+
+def run(people, method, samples, seed):
+    """
+    Draw `samples` samples with a new random number generator seeded with
+    `seed`, and return a tuple whose first element is an array of the
+    (weighted) number of samples in which each person has each gene count.
+
+    Likelihood weighting also returns the logarithm of the largest weight,
+    and the sums of weights and of squared weights divided by it (and by its
+    square). Gibbs sampling returns the effective sample size of each
+    person's gene count.
+    """
+    rng = np.random.default_rng(seed)
+    if method == "weighting":
+        return likelihood_weighting(people, samples, rng)
+    elif method == "gibbs":
+        return gibbs(people, samples, rng)
+    raise ValueError(f"unknown sampling method: {method}")
+
+
+def draw(probabilities, rng):
+    """
+    Return an array with one random gene count for each column of
+    `probabilities`, a 3 x n array whose columns sum to 1.
+    """
+    u = rng.random(probabilities.shape[1])
+    return (u >= probabilities[0]).astype(int) + (u >= probabilities[0] + probabilities[1])
+
+
+def forward(people, samples, rng):
+    """
+    Sample gene counts for everyone from the prior, parents first.
+    Return an array with one row per person (in the order of `people`)
+    and one column per sample.
+    """
+    row = {person: n for n, person in enumerate(people)}
+    inheritance = np.array(INHERITANCE)
+    genes = np.zeros((len(people), samples), dtype=int)
+    for person in ancestral_order(people):
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother and father:
+            probabilities = inheritance[:, genes[row[mother]], genes[row[father]]]
+        else:
+            probabilities = np.repeat(np.array(GENE)[:, None], samples, axis=1)
+        genes[row[person]] = draw(probabilities, rng)
+    return genes
+
+
+def likelihood_weighting(people, samples, rng):
+    """
+    Sample gene counts for everyone from the prior, weighting each sample
+    by the probability of the known traits.
+    """
+    genes = forward(people, samples, rng)
+    trait = np.array(LOG_TRAIT)
+    log_weights = np.zeros(samples)
+    for n, person in enumerate(people):
+        if people[person]["trait"] is not None:
+            log_weights += trait[genes[n], int(people[person]["trait"])]
+
+    # Weights are summed in log space, scaled by the largest weight
+    shift = log_weights.max()
+    weights = np.exp(log_weights - shift)
+    counts = np.stack([(genes == gene) @ weights for gene in range(3)], axis=1)
+    return counts, shift, weights.sum(), (weights ** 2).sum()
+
+
+def gibbs(people, samples, rng, chains=CHAINS, burn_in=BURN_IN):
+    """
+    Run `chains` Gibbs sampling chains side by side, resampling each
+    person's gene count in turn given everyone else's, until `samples`
+    samples have been recorded after `burn_in` sweeps.
+    """
+    names = list(people)
+    row = {person: n for n, person in enumerate(names)}
+    inheritance = np.array(INHERITANCE)
+    prior = np.array(GENE)
+    trait = np.array(TRAIT)
+    children = {person: [] for person in names}
+    for person in names:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent:
+                children[parent].append(person)
+
+    chains = max(min(chains, samples), 1)
+    sweeps = max(samples // chains, 1)
+    state = forward(people, chains, rng)
+    history = np.zeros((sweeps, len(names), chains), dtype=np.int8)
+
+    for sweep in range(burn_in + sweeps):
+        for person in names:
+            n = row[person]
+            mother, father = people[person]["mother"], people[person]["father"]
+            weights = np.empty((3, chains))
+            for gene in range(3):
+
+                # Probability of this gene count given the person's parents
+                if mother and father:
+                    weight = inheritance[gene, state[row[mother]], state[row[father]]]
+                else:
+                    weight = np.full(chains, prior[gene])
+                if people[person]["trait"] is not None:
+                    weight = weight * trait[gene, int(people[person]["trait"])]
+
+                # Probability of each child's gene count given this one
+                state[n] = gene
+                for child in children[person]:
+                    weight = weight * inheritance[
+                        state[row[child]],
+                        state[row[people[child]["mother"]]],
+                        state[row[people[child]["father"]]]
+                    ]
+                weights[gene] = weight
+            state[n] = draw(weights / weights.sum(axis=0), rng)
+        if sweep >= burn_in:
+            history[sweep - burn_in] = state
+
+    counts = np.stack(
+        [(history == gene).sum(axis=(0, 2)) for gene in range(3)], axis=1
+    ).astype(float)
+    ess = [effective_sample_size(history[:, n, :]) for n in range(len(names))]
+    return counts, ess
+
+
+def effective_sample_size(series):
+    """
+    Return the effective sample size of `series`, an array with one row
+    per step and one column per chain, from its autocorrelation averaged
+    over chains, summed up to the first negative lag.
+    """
+    steps, chains = series.shape
+    centered = series - series.mean()
+    variance = (centered ** 2).mean()
+    if variance == 0:
+        return steps * chains
+    total = 0
+    for lag in range(1, steps):
+        rho = (centered[lag:] * centered[:-lag]).mean() / variance
+        if rho < 0:
+            break
+        total += rho
+    return steps * chains / (1 + 2 * total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import pagerank
+from synthetic import barabasi_albert, write_html
+
+# Numbers of pages of the synthetic corpora timed
+SIZES = [100, 300, 1000]
+
+# Links added with each page, and fraction of pages without links
+LINKS = 3
+DANGLING = 0.1
+
+# Times each function is run, keeping the fastest
+REPEAT = 3
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python benchmark.py output.json [baseline.json]")
+    results = benchmark(SIZES)
+    with open(sys.argv[1], "w") as f:
+        json.dump(results, f, indent=4)
+
+    baseline = dict()
+    if len(sys.argv) == 3:
+        with open(sys.argv[2]) as f:
+            for entry in json.load(f)["results"]:
+                baseline[entry["function"], entry["pages"]] = entry["seconds"]
+    for entry in results["results"]:
+        line = f"{entry['function']:>28} {entry['pages']:>7}: {entry['seconds']:.4f}s"
+        previous = baseline.get((entry["function"], entry["pages"]))
+        if previous:
+            line += f" ({entry['seconds'] / previous:.2f}x baseline)"
+        print(line)
+
+
+def benchmark(sizes, repeat=REPEAT):
+    """
+    Time crawling and ranking synthetic corpora of each size in `sizes`,
+    with both the original functions of `pagerank` and their NumPy
+    counterparts. Return a dictionary describing the machine, with a list
+    of results: the function, the number of pages and the fastest time of
+    `repeat` runs, in seconds.
+    """
+    results = []
+    for pages in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            names = [f"{n}.html" for n in range(pages)]
+            write_html(directory, names, *barabasi_albert(pages, LINKS, DANGLING))
+            corpus = pagerank.crawl(directory)
+            functions = {
+                "crawl": lambda: pagerank.crawl(directory),
+                "crawler.crawl": lambda: crawler.crawl(directory, processes=1),
+                "sample_pagerank": lambda: pagerank.sample_pagerank(
+                    corpus, pagerank.DAMPING, pagerank.SAMPLES
+                ),
+                "vectorized_sample_pagerank": lambda: pagerank.vectorized_sample_pagerank(
+                    corpus, pagerank.DAMPING, pagerank.SAMPLES
+                ),
+                "iterate_pagerank": lambda: pagerank.iterate_pagerank(
+                    corpus, pagerank.DAMPING
+                ),
+                "sparse_pagerank": lambda: pagerank.sparse_pagerank(
+                    corpus, pagerank.DAMPING
+                )
+            }
+            for name, function in functions.items():
+                results.append({
+                    "function": name,
+                    "pages": pages,
+                    "seconds": fastest(function, repeat)
+                })
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results
+    }
+
+
+def fastest(function, repeat=REPEAT):
+    """
+    Return the shortest time, in seconds, taken by `repeat` calls to `function`.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from crawler import EDGE, links, pages, read_edges, write_names
+
+# Prefix of the cache files kept in each corpus directory
+CACHE = ".pagerank"
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python cache.py corpus [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else 1
+    _, count, edges, parsed = update(sys.argv[1], processes=processes)
+    print(f"{count} pages, {len(internal(edges, count))} links, {parsed} parsed")
+
+
+def crawl(directory, cache=None, processes=1):
+    """
+    Return the corpus in `directory` like `pagerank.crawl`, parsing only
+    the pages that changed since the cache at `cache` was last written.
+    """
+    names, count, edges, _ = update(directory, cache, processes)
+    corpus = {page: set() for page in names[:count]}
+    edges = internal(edges, count)
+    for source, target in zip(edges["source"].tolist(), edges["target"].tolist()):
+        corpus[names[source]].add(names[target])
+    return corpus
+
+
+def graph(directory, cache=None, processes=1):
+    """
+    Return the `graph.LinkGraph` of the corpus in `directory`, parsing only
+    the pages that changed since the cache at `cache` was last written.
+    """
+    from graph import LinkGraph
+
+    names, count, edges, _ = update(directory, cache, processes)
+    edges = internal(edges, count)
+    return LinkGraph(names[:count], edges["source"], edges["target"])
+
+
+def internal(edges, count):
+    """
+    Return the links in `edges` from one of the first `count` names
+    to another one of them.
+    """
+    return edges[(edges["target"] < count) & (edges["source"] != edges["target"])]
+
+
+def pairs(sources, targets):
+    """
+    Return an array of links from each of `sources` to each of `targets`.
+    """
+    edges = np.empty(len(sources), dtype=EDGE)
+    edges["source"] = sources
+    edges["target"] = targets
+    return edges
+
+
+def update(directory, cache=None, processes=1):
+    """
+    Bring the link cache of `directory` up to date, and return a tuple
+    `(names, count, edges, parsed)`.
+
+    `names` lists the `count` pages in `directory` in sorted order,
+    followed by every other name that they link to. `edges` is an array of
+    every link, as a pair of positions in `names`, and `parsed` the number
+    of pages parsed again because they are new or their modification time
+    or size changed. Pages are parsed in `processes` processes.
+    """
+    cache = cache or os.path.join(directory, CACHE)
+    stats = dict()
+    for page in pages(directory):
+        stat = os.stat(os.path.join(directory, page))
+        stats[page] = [stat.st_mtime_ns, stat.st_size]
+    old_stats, names, edges = load(cache)
+
+    # Keep the links of every page that has not changed
+    changed = [page for page in stats if old_stats.get(page) != stats[page]]
+    number = {name: n for n, name in enumerate(names)}
+    unchanged = [number[page] for page in stats if old_stats.get(page) == stats[page]]
+    kept = edges[np.isin(edges["source"], unchanged)]
+
+    # Parse every other page again
+    paths = [os.path.join(directory, page) for page in changed]
+    if processes > 1 and len(paths) > 1:
+        with multiprocessing.Pool(processes) as pool:
+            found = pool.map(parse, paths)
+    else:
+        found = [parse(path) for path in paths]
+
+    # Number pages first, then the other names that are still linked to
+    linked = {names[target] for target in np.unique(kept["target"]).tolist()}
+    linked.update(*found)
+    new_names = sorted(stats) + sorted(linked - stats.keys())
+    number = {name: n for n, name in enumerate(new_names)}
+    renumber = np.array([number.get(name, -1) for name in names], dtype=np.int32)
+    added = [
+        (number[page], number[target])
+        for page, targets in zip(changed, found)
+        for target in targets
+    ]
+    edges = np.concatenate([
+        pairs(renumber[kept["source"]], renumber[kept["target"]]),
+        pairs([source for source, _ in added], [target for _, target in added])
+    ])
+
+    if changed or stats.keys() != old_stats.keys():
+        save(cache, stats, new_names, edges)
+    return new_names, len(stats), edges, len(changed)
+
+
+def parse(path):
+    """
+    Return the sorted list of distinct links in the HTML file at `path`.
+    """
+    return sorted(set(links(path)))
+
+
+def load(cache):
+    """
+    Return a tuple `(stats, names, edges)` read from the cache at `cache`,
+    or an empty cache if it is missing or incomplete.
+    """
+    try:
+        with open(cache + ".json") as f:
+            header = json.load(f)
+        names, edges = read_edges(cache)
+        if len(names) == header["names"] and len(edges) == header["edges"]:
+            return header["stats"], names, edges
+    except (OSError, ValueError, KeyError):
+        pass
+    return dict(), [], np.empty(0, dtype=EDGE)
+
+
+def save(cache, stats, names, edges):
+    """
+    Write the cache at `cache`, replacing each file only once it is written
+    in full, and the header last, so that an interrupted write is detected.
+    """
+    write_names(cache + ".tmp", names)
+    os.replace(cache + ".tmp.names", cache + ".names")
+    edges.tofile(cache + ".tmp.edges")
+    os.replace(cache + ".tmp.edges", cache + ".edges")
+    with open(cache + ".tmp.json", "w") as f:
+        json.dump({"names": len(names), "edges": len(edges), "stats": stats}, f)
+    os.replace(cache + ".tmp.json", cache + ".json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import sys
+
+from graph import METHODS, LinkGraph
+from pagerank import DAMPING, crawl
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python convergence.py corpus [method]")
+    graph = LinkGraph.from_corpus(crawl(sys.argv[1]))
+
+    # Trace one method iteration by iteration, or compare them all
+    if len(sys.argv) == 3:
+        if sys.argv[2] not in METHODS:
+            sys.exit(f"Unknown method: {sys.argv[2]}")
+        _, history = graph.solve(DAMPING, sys.argv[2])
+        for record in history:
+            print(
+                f"  {record['iteration']:4d}: residual {record['residual']:.3e}, "
+                f"{record['time'] * 1000:.2f}ms"
+            )
+        return
+    for method in METHODS:
+        _, history = graph.solve(DAMPING, method)
+        print(
+            f"{method}: {len(history)} iterations, "
+            f"residual {history[-1]['residual']:.3e}, "
+            f"{history[-1]['time'] * 1000:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
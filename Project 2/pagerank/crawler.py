@@ -0,0 +1,146 @@
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+
+import numpy as np
+
+# Links in an HTML page, matched on the raw bytes of the file
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Each link is stored on disk as a pair of page numbers (source, target)
+EDGE = np.dtype([("source", np.int32), ("target", np.int32)])
+
+# Page numbers of the corpus being crawled, set in each worker process
+number = dict()
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python crawler.py corpus output [processes]")
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    names = crawl_edges(sys.argv[1], sys.argv[2], processes)
+    edges = os.path.getsize(sys.argv[2] + ".edges") // EDGE.itemsize
+    print(f"{len(names)} pages, {edges} links")
+
+
+def links(path):
+    """
+    Yield each link in the HTML file at `path`, in order.
+
+    The file is memory-mapped and scanned in place, so only the parts of
+    it around the current match need to be in memory.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            for match in LINK.finditer(contents):
+                yield match.group(1).decode("utf-8", "surrogateescape")
+
+
+def pages(directory):
+    """
+    Return the sorted list of HTML files in `directory`.
+    """
+    with os.scandir(directory) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.name.endswith(".html") and entry.is_file()
+        )
+
+
+def parse(task):
+    """
+    Return a tuple `(source, targets)` for a `(directory, filename)` task,
+    where `source` is the number of the page and `targets` an array of the
+    numbers of the other pages in the corpus it links to.
+    """
+    directory, filename = task
+    source = number[filename]
+    targets = {number.get(link) for link in links(os.path.join(directory, filename))}
+    targets -= {None, source}
+    return source, np.array(sorted(targets), dtype=np.int32)
+
+
+def initialize(names):
+    """
+    Number the pages `names` in a worker process.
+    """
+    number.clear()
+    number.update((page, n) for n, page in enumerate(names))
+
+
+def scan(directory, names, processes=None):
+    """
+    Parse the pages `names` in `directory` in a pool of `processes` worker
+    processes (or in this process if `processes` is 1), and yield a tuple
+    `(source, targets)` for each page in the order they finish.
+    """
+    tasks = [(directory, filename) for filename in names]
+    if processes == 1:
+        initialize(names)
+        yield from map(parse, tasks)
+        return
+    with multiprocessing.Pool(processes, initialize, (names,)) as pool:
+        chunksize = max(len(tasks) // (4 * (processes or os.cpu_count() or 1)), 1)
+        yield from pool.imap_unordered(parse, tasks, chunksize)
+
+
+def crawl(directory, processes=None):
+    """
+    Parse a directory of HTML pages like `pagerank.crawl`, in parallel.
+    Return a dictionary mapping each page to the set of other pages
+    in the corpus that it links to.
+    """
+    names = pages(directory)
+    return {
+        names[source]: {names[target] for target in targets}
+        for source, targets in scan(directory, names, processes)
+    }
+
+
+def crawl_edges(directory, output, processes=None):
+    """
+    Parse a directory of HTML pages in parallel, writing each page's name
+    on its own line of `output` + ".names", and its links to other pages
+    to `output` + ".edges" as they are found. Return the list of names.
+    """
+    names = pages(directory)
+    write_names(output, names)
+    with open(output + ".edges", "wb") as f:
+        for source, targets in scan(directory, names, processes):
+            edges = np.empty(len(targets), dtype=EDGE)
+            edges["source"] = source
+            edges["target"] = targets
+            f.write(edges.tobytes())
+    return names
+
+
+def write_names(output, names):
+    """
+    Write each of `names` on its own line of `output` + ".names".
+    """
+    with open(output + ".names", "w", encoding="utf-8", errors="surrogateescape") as f:
+        for name in names:
+            f.write(name + "\n")
+
+
+def read_edges(output, memory_map=False):
+    """
+    Return a tuple `(names, edges)` of the page names and the links written
+    by `crawl_edges` to `output`, where `edges` is an array with fields
+    "source" and "target", memory-mapped from disk if `memory_map` is true.
+    """
+    with open(output + ".names", encoding="utf-8", errors="surrogateescape") as f:
+        names = f.read().splitlines()
+    if memory_map and os.path.getsize(output + ".edges"):
+        edges = np.memmap(output + ".edges", dtype=EDGE, mode="r")
+    else:
+        edges = np.fromfile(output + ".edges", dtype=EDGE)
+    return names, edges
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import math
+import time
+
+import numpy as np
+
+# Ways of solving for PageRank that `LinkGraph.solve` can use
+METHODS = ["jacobi", "gauss-seidel", "aitken", "quadratic"]
+
+# Number of iterations between extrapolations
+EXTRAPOLATE = 10
+
+# Number of blocks of pages updated in turn in each Gauss-Seidel sweep
+SWEEP_BLOCKS = 64
+
+
+class LinkGraph():
+    """
+    Link graph of a corpus, stored as a sparse transition matrix in
+    compressed sparse row (CSR) form: row i lists the pages linking to
+    page i, each weighted by 1 / (number of links on the linking page).
+    """
+
+    def __init__(self, names, sources, targets):
+        """
+        Build the graph of pages `names` with a link from page number
+        `sources[k]` to page number `targets[k]` for each k.
+        """
+        self.names = list(names)
+        n = len(self.names)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        # Count links out of each page; pages without links are dangling
+        self.outdegree = np.bincount(sources, minlength=n)
+        self.dangling = self.outdegree == 0
+
+        # Sort links by target page to build the rows of the matrix
+        order = np.argsort(targets, kind="stable")
+        self.indices = sources[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=self.indptr[1:])
+        self.data = 1 / self.outdegree[self.indices]
+
+        # Rows with at least one entry, for summing rows with np.add.reduceat
+        self.nonempty = self.indptr[:-1] < self.indptr[1:]
+        self.starts = self.indptr[:-1][self.nonempty]
+
+        # Also sort links by source page, to follow links out of each page
+        order = np.argsort(sources, kind="stable")
+        self.out_indices = targets[order]
+        self.out_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.outdegree, out=self.out_indptr[1:])
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the graph of a corpus as returned by `pagerank.crawl`.
+        """
+        names = sorted(corpus)
+        number = {page: n for n, page in enumerate(names)}
+        sources = []
+        targets = []
+        for page in names:
+            for link in corpus[page]:
+                sources.append(number[page])
+                targets.append(number[link])
+        return cls(names, sources, targets)
+
+    def __len__(self):
+        return len(self.names)
+
+    def multiply(self, vector):
+        """
+        Return the product of the transition matrix and `vector`: for each
+        page, the sum over pages linking to it of their value in `vector`
+        divided by their number of links.
+        """
+        result = np.zeros(len(self))
+        if len(self.indices):
+            result[self.nonempty] = np.add.reduceat(
+                vector[self.indices] * self.data, self.starts
+            )
+        return result
+
+    def pagerank(self, damping_factor, tolerance=0.001):
+        """
+        Return an array of PageRank values, one per page, found by power
+        iteration from a uniform distribution until no value changes by
+        `tolerance` or more. Pages without links are treated as linking
+        to every page, including themselves.
+        """
+        rank = np.full(len(self), 1 / len(self))
+        while True:
+            new_rank = self.step(rank, damping_factor)
+            new_rank /= new_rank.sum()
+            if np.abs(new_rank - rank).max() < tolerance:
+                return new_rank
+            rank = new_rank
+
+    def step(self, rank, damping_factor):
+        """
+        Return the PageRank values given by the PageRank equation
+        when each page has the value in `rank`.
+        """
+        n = len(self)
+        dangling = rank[self.dangling].sum()
+        return (1 - damping_factor) / n + damping_factor * (
+            self.multiply(rank) + dangling / n
+        )
+
+    def sweep(self, rank, damping_factor, blocks=SWEEP_BLOCKS):
+        """
+        Update `rank` in place by one Gauss-Seidel sweep of the PageRank
+        equation, over `blocks` blocks of pages in turn, so that each block
+        already uses the values just computed for the blocks before it.
+        """
+        n = len(self)
+        dangling = rank[self.dangling].sum()
+        bounds = np.linspace(0, n, min(blocks, n) + 1).astype(np.int64)
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            first, last = self.indptr[low], self.indptr[high]
+            block = np.zeros(high - low)
+            nonempty = self.nonempty[low:high]
+            if last > first:
+                block[nonempty] = np.add.reduceat(
+                    rank[self.indices[first:last]] * self.data[first:last],
+                    self.indptr[low:high][nonempty] - first
+                )
+            block = (1 - damping_factor) / n + damping_factor * (block + dangling / n)
+            dangling += (block - rank[low:high])[self.dangling[low:high]].sum()
+            rank[low:high] = block
+        return rank
+
+    def solve(self, damping_factor, method="jacobi", tolerance=1e-8, iterations=1000):
+        """
+        Return a tuple `(rank, history)` of an array of PageRank values
+        found by `method`, one of `METHODS`, and a list with a dictionary
+        for each iteration giving its number, its residual (the L1 change
+        it made to the values) and the seconds elapsed since the start.
+
+        Iterations stop once the residual is below `tolerance`, or after
+        `iterations` iterations. "jacobi" is plain power iteration, and
+        "gauss-seidel" uses `sweep`. "aitken" and "quadratic" are power
+        iteration, extrapolated every `EXTRAPOLATE` iterations from the
+        last three or four iterates.
+        """
+        if method not in METHODS:
+            raise ValueError(f"unknown PageRank method: {method}")
+        start = time.perf_counter()
+        rank = np.full(len(self), 1 / len(self))
+        recent = [rank]
+        history = []
+        for iteration in range(1, iterations + 1):
+            if method == "gauss-seidel":
+                new_rank = self.sweep(rank.copy(), damping_factor)
+            else:
+                new_rank = self.step(rank, damping_factor)
+            new_rank /= new_rank.sum()
+            residual = np.abs(new_rank - rank).sum()
+            history.append({
+                "iteration": iteration,
+                "residual": float(residual),
+                "time": time.perf_counter() - start
+            })
+            rank = new_rank
+            if residual < tolerance:
+                break
+
+            # Jump towards the limit from the last few iterates
+            recent = recent[-3:] + [rank]
+            if iteration % EXTRAPOLATE == 0:
+                if method == "aitken":
+                    rank = aitken(*recent[-3:])
+                elif method == "quadratic" and len(recent) == 4:
+                    rank = quadratic(*recent)
+                recent = [rank]
+        return rank, history
+
+    def sample(self, damping_factor, n, walkers=1000, seed=None, burn_in=None):
+        """
+        Return an array of PageRank values estimated from `n` samples,
+        taken by `walkers` random surfers moving side by side from random
+        starting pages, seeded with `seed`.
+
+        At each step, each surfer follows a random link out of its page
+        with probability `damping_factor`, and otherwise (or if its page
+        has no links) jumps to a page chosen at random from all pages.
+        Both choices are uniform, so each takes constant time.
+
+        Surfers first take `burn_in` steps that are not counted, by default
+        enough for the chance of never having jumped to fall below 1e-3
+        (43 steps at a damping factor of 0.85): with many surfers, each
+        takes only a few counted steps, and without a burn-in those would
+        stay biased towards the uniform starting distribution.
+        """
+        rng = np.random.default_rng(seed)
+        pages = len(self)
+        walkers = max(min(walkers, n), 1)
+        if burn_in is None:
+            burn_in = burn_in_steps(damping_factor)
+        position = rng.integers(pages, size=walkers)
+        for _ in range(burn_in):
+            position = self.move(position, damping_factor, rng)
+
+        counts = np.zeros(pages, dtype=np.int64)
+        taken = 0
+        while taken < n:
+            position = self.move(position, damping_factor, rng)
+
+            # Only count as many surfers as there are samples left to take
+            step = min(walkers, n - taken)
+            counts += np.bincount(position[:step], minlength=pages)
+            taken += step
+        return counts / n
+
+    def move(self, position, damping_factor, rng):
+        """
+        Return the pages that surfers on pages `position` move to next.
+        """
+        following = np.flatnonzero(
+            (rng.random(len(position)) < damping_factor) & ~self.dangling[position]
+        )
+        current = position[following]
+        position = rng.integers(len(self), size=len(position))
+        position[following] = self.out_indices[
+            self.out_indptr[current] +
+            (rng.random(len(following)) * self.outdegree[current]).astype(np.int64)
+        ]
+        return position
+
+    def ranks(self, vector):
+        """
+        Return a dictionary mapping each page name to its value in `vector`.
+        """
+        return {page: float(value) for page, value in zip(self.names, vector)}
+
+
+def burn_in_steps(damping_factor, bias=1e-3):
+    """
+    Return the number of steps after which the chance that a surfer has
+    followed a link at every step, and so may still be near where it
+    started, is below `bias`.
+    """
+    if damping_factor <= 0:
+        return 0
+    if damping_factor >= 1:
+        raise ValueError("damping factor must be below 1 to burn in")
+    return math.ceil(math.log(bias) / math.log(damping_factor))
+
+
+def aitken(first, second, third):
+    """
+    Return Aitken's delta-squared extrapolation of three successive
+    iterates, page by page, keeping the last iterate wherever the
+    values are not converging geometrically.
+    """
+    step = third - second
+    curvature = step - (second - first)
+    result = third.copy()
+    usable = np.abs(curvature) > 1e-15
+    result[usable] -= step[usable] ** 2 / curvature[usable]
+    result[result <= 0] = third[result <= 0]
+    return result / result.sum()
+
+
+def quadratic(first, second, third, fourth):
+    """
+    Return the quadratic extrapolation of four successive iterates of
+    power iteration, which removes the parts of the error along the
+    second and third eigenvectors of the transition matrix, assuming the
+    error lies mostly along them.
+    """
+    differences = np.stack([second - first, third - first], axis=1)
+    gamma = np.linalg.lstsq(differences, -(fourth - first), rcond=None)[0]
+    gamma = np.append(gamma, 1)
+    beta = np.cumsum(gamma[::-1])[::-1]
+    result = beta[0] * second + beta[1] * third + beta[2] * fourth
+    if (result <= 0).any():
+        return fourth
+    return result / result.sum()
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+import cache
+from pagerank import DAMPING
+
+# Bound on the L1 distance, summed over all pages, between the ranks an
+# update returns and exact PageRank. A tighter bound makes pushes spread
+# from a small change over most of a well-connected graph
+TOLERANCE = 1e-3
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python incremental.py corpus")
+    directory = sys.argv[1]
+    graph = cache.graph(directory)
+
+    # Start from the ranks saved by the last run, if any
+    saved = os.path.join(directory, cache.CACHE + ".ranks.json")
+    try:
+        with open(saved) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = dict()
+    rank, pushes = update_pagerank(graph, previous, DAMPING)
+    ranks = graph.ranks(rank)
+    with open(saved, "w") as f:
+        json.dump(ranks, f)
+
+    print(f"PageRank Results after {pushes} pushes")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def update_pagerank(graph, previous, damping_factor, tolerance=TOLERANCE):
+    """
+    Return a tuple `(rank, pushes)` of PageRank values for each page of
+    `graph`, starting from `previous`, a dictionary of earlier values by
+    page name, and the number of times a page's residual was pushed.
+
+    Pages missing from `previous` start at the average of all pages. Only
+    pages with a large enough residual are updated, so a small change to a
+    graph whose ranks are known only does work near the change. How near
+    depends on `tolerance`: each page's share of it shrinks as 1 / N, so
+    a tight tolerance spreads the work over much of the graph again.
+    """
+    n = len(graph)
+    rank = np.array([previous.get(page, np.nan) for page in graph.names])
+    rank[np.isnan(rank)] = 1 / n
+    rank /= rank.sum()
+    return push(graph, rank, residual(graph, rank, damping_factor),
+                damping_factor, tolerance)
+
+
+def residual(graph, rank, damping_factor):
+    """
+    Return how far each value of `rank` is from the PageRank equation:
+    the value the equation gives for each page minus its value in `rank`.
+    """
+    return graph.step(rank, damping_factor) - rank
+
+
+def push(graph, rank, residual, damping_factor, tolerance=TOLERANCE):
+    """
+    Update `rank` in place, given its `residual`, until its total distance
+    from PageRank is at most `tolerance`. Return a tuple `(rank, pushes)`
+    of `rank` normalized to sum to 1 and the number of pushes made.
+
+    In each round, every page whose residual is above its share of the
+    tolerance adds its residual to its rank, then passes `damping_factor`
+    times it on to the pages it links to, in equal parts (or to every page,
+    if it has no links).
+    """
+    n = len(graph)
+    threshold = tolerance * (1 - damping_factor) / n
+    pushes = 0
+    while True:
+        active = np.flatnonzero(np.abs(residual) > threshold)
+        if not len(active):
+            break
+        pushes += len(active)
+        amount = residual[active]
+        rank[active] += amount
+        residual[active] = 0
+
+        # Spread the residual of pages without links over every page
+        dangling = graph.dangling[active]
+        residual += damping_factor * amount[dangling].sum() / n
+
+        # Spread the residual of other pages over the pages they link to
+        linking = active[~dangling]
+        counts = graph.outdegree[linking]
+        offsets = np.repeat(graph.out_indptr[linking] - np.cumsum(counts) + counts, counts)
+        targets = graph.out_indices[offsets + np.arange(counts.sum())]
+        shares = np.repeat(damping_factor * amount[~dangling] / counts, counts)
+        residual += np.bincount(targets, shares, minlength=n)
+
+    return rank / rank.sum(), pushes
+
+
+if __name__ == "__main__":
+    main()
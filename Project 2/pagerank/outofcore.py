@@ -0,0 +1,74 @@
+import sys
+
+import numpy as np
+
+from crawler import read_edges
+from pagerank import DAMPING
+
+# Number of links read from disk at a time
+BLOCK = 1 << 22
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python outofcore.py edges [top]")
+    top = int(sys.argv[2]) if len(sys.argv) == 3 else 10
+    names, edges = read_edges(sys.argv[1], memory_map=True)
+    rank = pagerank(edges, len(names), DAMPING)
+    print(f"Top {min(top, len(names))} of {len(names)} pages by PageRank")
+    for n in np.argsort(-rank, kind="stable")[:top]:
+        print(f"  {names[n]}: {rank[n]:.6f}")
+
+
+def blocks(edges, count, block=BLOCK):
+    """
+    Yield a tuple `(sources, targets)` of arrays for each block of `block`
+    links in `edges`, skipping links to themselves or to pages numbered
+    `count` or above.
+    """
+    for start in range(0, len(edges), block):
+        chunk = np.asarray(edges[start:start + block])
+        chunk = chunk[(chunk["target"] < count) & (chunk["source"] != chunk["target"])]
+        yield chunk["source"], chunk["target"]
+
+
+def pagerank(edges, count, damping_factor, tolerance=1e-6, block=BLOCK, dtype=np.float64):
+    """
+    Return an array of PageRank values for the first `count` pages of
+    `edges`, an array (usually memory-mapped by `crawler.read_edges`) of
+    links with fields "source" and "target".
+
+    Links are read `block` at a time, so only vectors of one value per page
+    are kept in memory: the ranks, stored as `dtype`, and the next ranks,
+    summed in float64 so that a float32 `dtype` still reaches `tolerance`.
+    Power iteration starts from a uniform distribution and stops once the
+    values change by less than `tolerance` in total.
+    """
+    # Accumulate each block in place, as a page-length temporary per block
+    # would make each pass cost O(N) per block instead of O(links)
+    outdegree = np.zeros(count, dtype=np.int64)
+    for sources, _ in blocks(edges, count, block):
+        np.add.at(outdegree, sources, 1)
+    dangling = outdegree == 0
+    inverse = np.zeros(count, dtype=dtype)
+    inverse[~dangling] = 1 / outdegree[~dangling]
+    del outdegree
+
+    rank = np.full(count, 1 / count, dtype=dtype)
+    while True:
+        # Scatter float64 values into the float64 sums, as NumPy's
+        # mixed-type np.add.at is several times slower
+        share = rank.astype(np.float64) * inverse
+        new_rank = np.zeros(count)
+        for sources, targets in blocks(edges, count, block):
+            np.add.at(new_rank, targets, share[sources])
+        new_rank *= damping_factor
+        new_rank += (1 - damping_factor + damping_factor * rank[dangling].sum()) / count
+        new_rank = (new_rank / new_rank.sum()).astype(dtype)
+        if np.abs(new_rank - rank).sum() < tolerance:
+            return new_rank
+        rank = new_rank
+
+
+if __name__ == "__main__":
+    main()
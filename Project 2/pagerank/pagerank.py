@@ -8,14 +8,25 @@ SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    if len(sys.argv) not in [2, 3] or (len(sys.argv) == 3 and sys.argv[2] != "numpy"):
+        sys.exit("Usage: python pagerank.py corpus [numpy]")
+    vectorized = len(sys.argv) == 3
+    if vectorized:
+        from cache import crawl as cached_crawl
+        corpus = cached_crawl(sys.argv[1])
+    else:
+        corpus = crawl(sys.argv[1])
+    if vectorized:
+        ranks = vectorized_sample_pagerank(corpus, DAMPING, SAMPLES)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    if vectorized:
+        ranks = sparse_pagerank(corpus, DAMPING)
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -142,5 +153,29 @@ def iterate_pagerank(corpus, damping_factor):
     return new_pagerank
 
 
+def vectorized_sample_pagerank(corpus, damping_factor, n, walkers=1000, seed=None):
+    """
+    Return PageRank values for each page like `sample_pagerank`, from `n`
+    samples taken by `walkers` random surfers moving side by side with NumPy,
+    after a burn-in of uncounted steps (see `LinkGraph.sample`).
+    """
+    from graph import LinkGraph
+
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.ranks(graph.sample(damping_factor, n, walkers, seed))
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=0.001):
+    """
+    Return PageRank values for each page like `iterate_pagerank`, by
+    power iteration over a sparse transition matrix built once with NumPy,
+    stopping when no value changes by `tolerance` or more.
+    """
+    from graph import LinkGraph
+
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.ranks(graph.pagerank(damping_factor, tolerance))
+
+
 if __name__ == "__main__":
     main()
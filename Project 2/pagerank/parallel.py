@@ -0,0 +1,216 @@
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from graph import LinkGraph
+from pagerank import DAMPING
+
+# Seconds a worker waits at a barrier for the others before giving up
+TIMEOUT = 300
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python parallel.py pages links [processes ...]")
+    pages, links = int(sys.argv[1]), int(sys.argv[2])
+    counts = [int(arg) for arg in sys.argv[3:]] or sorted({1, 2, 4, os.cpu_count() or 1})
+    graph = random_graph(pages, links)
+
+    start = time.perf_counter()
+    expected = graph.pagerank(DAMPING)
+    serial = time.perf_counter() - start
+    print(f"{pages} pages, {links} links, {os.cpu_count()} cores")
+    print(f"  serial: {serial:.3f}s")
+    for processes in counts:
+        start = time.perf_counter()
+        rank = pagerank(graph, DAMPING, processes=processes)
+        elapsed = time.perf_counter() - start
+        error = np.abs(rank - expected).max()
+        print(
+            f"  {processes} processes: {elapsed:.3f}s, "
+            f"speedup {serial / elapsed:.2f}, error {error:.1e}"
+        )
+
+
+def random_graph(pages, links, seed=0):
+    """
+    Return a `LinkGraph` of `pages` pages and up to `links` random links,
+    with sources chosen uniformly and targets skewed towards a few
+    popular pages, as on the web.
+    """
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(pages, size=links)
+    targets = (rng.zipf(1.5, size=links) * 7919) % pages
+    keep = sources != targets
+    return LinkGraph(
+        [f"{n}.html" for n in range(pages)], sources[keep], targets[keep]
+    )
+
+
+def partition(indptr, parts):
+    """
+    Return the `parts + 1` boundaries of `parts` blocks of consecutive rows
+    of a matrix with row pointers `indptr`, each holding about as many rows
+    plus entries as the others.
+    """
+    rows = len(indptr) - 1
+    work = indptr + np.arange(rows + 1)
+    bounds = np.searchsorted(work, np.linspace(0, work[-1], parts + 1))
+    bounds[0], bounds[-1] = 0, rows
+    return np.maximum.accumulate(bounds)
+
+
+def share(arrays):
+    """
+    Copy each array in the dictionary `arrays` into new shared memory.
+    Return a tuple `(blocks, spec, shared)` of the list of shared memory
+    blocks, a dictionary mapping each key to `(name, shape, dtype)` for
+    `attach`, and a dictionary of arrays viewing the blocks.
+    """
+    blocks = []
+    spec = dict()
+    shared = dict()
+    for key, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared[key] = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+        shared[key][...] = array
+        blocks.append(block)
+        spec[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec, shared
+
+
+def attach(spec):
+    """
+    Return a tuple `(blocks, arrays)` of the shared memory blocks described
+    by `spec`, and a dictionary of arrays viewing them.
+    """
+    blocks = []
+    arrays = dict()
+    for key, (name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def pagerank(graph, damping_factor, tolerance=0.001, processes=None, timeout=TIMEOUT):
+    """
+    Return an array of PageRank values for `graph` like `LinkGraph.pagerank`,
+    found by `processes` worker processes.
+
+    Each process owns a block of rows of the transition matrix, and so a
+    block of pages. Rank vectors live in shared memory; processes update
+    their own pages in the next vector, and wait for each other at a
+    barrier before totals over all pages are needed. If any worker fails,
+    or waits more than `timeout` seconds at a barrier, every worker stops
+    and a RuntimeError is raised.
+    """
+    processes = processes or os.cpu_count() or 1
+    n = len(graph)
+    blocks, spec, shared = share({
+        "indptr": graph.indptr,
+        "indices": graph.indices,
+        "data": graph.data,
+        "dangling": graph.dangling,
+        "ranks": np.full((2, n), 1 / n),
+        "totals": np.zeros((processes, 3)),
+        "iterations": np.zeros(1, dtype=np.int64)
+    })
+    try:
+        bounds = partition(graph.indptr, processes)
+        barrier = multiprocessing.Barrier(processes, timeout=timeout)
+        workers = [
+            multiprocessing.Process(
+                target=work,
+                args=(spec, bounds, worker, barrier, damping_factor, tolerance)
+            )
+            for worker in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if any(worker.exitcode for worker in workers):
+            raise RuntimeError("PageRank worker process failed")
+        return shared["ranks"][shared["iterations"][0] % 2].copy()
+    finally:
+        del shared
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def work(spec, bounds, worker, barrier, damping_factor, tolerance):
+    """
+    Attach to the shared memory of `spec` and run `iterate` in a worker.
+    If it fails, break the barrier so that the other workers stop too.
+    """
+    blocks, arrays = attach(spec)
+    try:
+        iterate(arrays, bounds, worker, barrier, damping_factor, tolerance)
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def iterate(arrays, bounds, worker, barrier, damping_factor, tolerance):
+    """
+    Update the PageRank values of pages `bounds[worker]` up to
+    `bounds[worker + 1]` in the shared vectors of `arrays`, iterating in
+    step with the other workers until none of the values changes by
+    `tolerance` or more.
+    """
+    indptr, indices, data = arrays["indptr"], arrays["indices"], arrays["data"]
+    ranks, totals = arrays["ranks"], arrays["totals"]
+    n = ranks.shape[1]
+    low, high = bounds[worker], bounds[worker + 1]
+    dangling = arrays["dangling"][low:high]
+
+    # Entries of this block of rows, for summing rows with np.add.reduceat
+    first, last = indptr[low], indptr[high]
+    sources = indices[first:last]
+    weights = data[first:last]
+    nonempty = indptr[low:high] < indptr[low + 1:high + 1]
+    starts = indptr[low:high][nonempty] - first
+
+    iteration = 0
+    while True:
+        rank, new_rank = ranks[iteration % 2], ranks[(iteration + 1) % 2]
+
+        # Share the rank of this block's pages without links
+        totals[worker, 0] = rank[low:high][dangling].sum()
+        barrier.wait()
+        spread = totals[:, 0].sum() / n
+
+        # Compute this block of the next rank, and its total
+        part = np.zeros(high - low)
+        if len(sources):
+            part[nonempty] = np.add.reduceat(rank[sources] * weights, starts)
+        part = (1 - damping_factor) / n + damping_factor * (part + spread)
+        new_rank[low:high] = part
+        totals[worker, 1] = part.sum()
+        barrier.wait()
+
+        # Normalize, and stop together once no value changes enough
+        new_rank[low:high] /= totals[:, 1].sum()
+        totals[worker, 2] = (
+            np.abs(new_rank[low:high] - rank[low:high]).max() if high > low else 0
+        )
+        barrier.wait()
+        iteration += 1
+        if totals[:, 2].max() < tolerance:
+            break
+    if worker == 0:
+        arrays["iterations"][0] = iteration
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import sys
+
+import numpy as np
+
+from graph import LinkGraph
+from pagerank import DAMPING, crawl
+
+# Number of seed sets solved together in one power iteration
+BATCH = 32
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus page[,page...] ...")
+    graph = LinkGraph.from_corpus(crawl(sys.argv[1]))
+    seed_sets = [seeds.split(",") for seeds in sys.argv[2:]]
+    for seeds, top in zip(seed_sets, top_pages(graph, seed_sets, DAMPING)):
+        print(f"Personalized PageRank for {', '.join(seeds)}")
+        for page, rank in top:
+            print(f"  {page}: {rank:.4f}")
+
+
+def teleport_matrix(graph, seed_sets):
+    """
+    Return a matrix with one row per set of page names in `seed_sets` and
+    one column per page of `graph`, each row spreading probability 1
+    evenly over the pages of its set.
+    """
+    number = {page: n for n, page in enumerate(graph.names)}
+    teleport = np.zeros((len(seed_sets), len(graph)))
+    for row, seeds in enumerate(seed_sets):
+        columns = [number[page] for page in set(seeds)]
+        if not columns:
+            raise ValueError(f"empty seed set at position {row}")
+        teleport[row, columns] = 1 / len(columns)
+    return teleport
+
+
+def personalized_pagerank(graph, teleport, damping_factor, tolerance=1e-6):
+    """
+    Return a matrix of personalized PageRank values, one row for each row
+    of `teleport`, a matrix of distributions over the pages of `graph` to
+    jump to instead of following a link.
+
+    Surfers on pages without links also jump by the same distribution.
+    All rows are iterated together, and each one stops being updated once
+    it changes by less than `tolerance` in total.
+    """
+    result = teleport.copy()
+    active = np.arange(len(teleport))
+    rank = teleport[active]
+    jump = teleport[active]
+    while len(active):
+
+        # NumPy has no sparse matrix-matrix product, and multiplying one
+        # row at a time keeps each product in cache
+        new_rank = np.stack([graph.multiply(row) for row in rank])
+        new_rank += jump * rank[:, graph.dangling].sum(axis=1, keepdims=True)
+        new_rank *= damping_factor
+        new_rank += (1 - damping_factor) * jump
+        new_rank /= new_rank.sum(axis=1, keepdims=True)
+
+        # Set aside the rows that have converged
+        running = np.abs(new_rank - rank).sum(axis=1) >= tolerance
+        if not running.all():
+            result[active[~running]] = new_rank[~running]
+            active, new_rank, jump = active[running], new_rank[running], jump[running]
+        rank = new_rank
+    return result
+
+
+def top_pages(graph, seed_sets, damping_factor, k=10, tolerance=1e-6, batch=BATCH):
+    """
+    Return, for each set of page names in `seed_sets`, a list of the `k`
+    pages of `graph` with the highest PageRank personalized to that set,
+    as `(page, rank)` tuples from highest to lowest.
+
+    Seed sets are solved `batch` at a time, so only `batch` rows of the
+    teleport and rank matrices are ever held in memory.
+    """
+    k = min(k, len(graph))
+    result = []
+    for start in range(0, len(seed_sets), batch):
+        teleport = teleport_matrix(graph, seed_sets[start:start + batch])
+        rank = personalized_pagerank(graph, teleport, damping_factor, tolerance)
+
+        # Find the top k pages of each row, then sort just those
+        top = np.argpartition(-rank, k - 1, axis=1)[:, :k]
+        values = np.take_along_axis(rank, top, axis=1)
+        order = np.argsort(-values, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        values = np.take_along_axis(values, order, axis=1)
+        for pages, ranks in zip(top.tolist(), values.tolist()):
+            result.append([(graph.names[page], rank) for page, rank in zip(pages, ranks)])
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import sys
+
+import numpy as np
+
+from crawler import EDGE, write_names
+
+# Page written for each page of a synthetic corpus, like the bundled ones
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{title}</title>
+    </head>
+    <body>
+        <h1>{title}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}
+        </ul>
+    </body>
+</html>
+"""
+
+
+def main():
+    if len(sys.argv) not in range(3, 8):
+        sys.exit(
+            "Usage: python synthetic.py pages output "
+            "[links] [dangling] [html|edges] [seed]"
+        )
+    pages = int(sys.argv[1])
+    output = sys.argv[2]
+    links = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    dangling = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    form = sys.argv[5] if len(sys.argv) > 5 else "html"
+    seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    if form not in ["html", "edges"]:
+        sys.exit(f"Unknown output format: {form}")
+
+    names = [f"{n}.html" for n in range(pages)]
+    sources, targets = barabasi_albert(pages, links, dangling, seed)
+    if form == "html":
+        write_html(output, names, sources, targets)
+    else:
+        write_edge_list(output, names, sources, targets)
+    print(f"{pages} pages, {len(sources)} links")
+
+
+def barabasi_albert(pages, links=3, dangling=0.1, seed=0):
+    """
+    Return a tuple `(sources, targets)` of arrays of page numbers, one
+    entry per link, of a Barabasi-Albert graph of `pages` pages.
+
+    Pages are added one at a time, each linking to `links` earlier pages
+    chosen with probability proportional to their number of links so far,
+    so that a few pages collect most links, as on the web. Then a random
+    `dangling` fraction of all pages lose their links. Duplicate links
+    are merged.
+    """
+    rng = np.random.default_rng(seed)
+    links = max(min(links, pages - 1), 0)
+    count = (pages - links) * links
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Choosing a page in proportion to its links means choosing a random
+    # end of a random earlier link. The first `links` pages form a pool
+    # of their own; after that, link k has its source at position
+    # `links + 2k` of the pool and its target at `links + 2k + 1`
+    k = np.arange(count)
+    sources = links + k // links
+    position = rng.integers(links + 2 * links * (k // links))
+
+    # Follow each chosen target end back to an earlier link until it
+    # reaches a known page: a first page, or the source of some link
+    targets = np.full(count, -1, dtype=np.int64)
+    pending = k
+    while len(pending):
+        p = position[pending]
+        first = p < links
+        targets[pending[first]] = p[first]
+        source = ~first & ((p - links) % 2 == 0)
+        targets[pending[source]] = sources[(p[source] - links) // 2]
+        pending = pending[~first & ~source]
+        position[pending] = position[(position[pending] - links) // 2]
+
+    # Remove every link out of the chosen dangling pages, then duplicates
+    keep = rng.random(pages)[sources] >= dangling
+    edges = np.unique(sources[keep] * pages + targets[keep])
+    return edges // pages, edges % pages
+
+
+def write_html(directory, names, sources, targets):
+    """
+    Write a page named after each of `names` to `directory`, linking
+    from page `sources[k]` to page `targets[k]` for each k.
+    """
+    os.makedirs(directory, exist_ok=True)
+    order = np.argsort(sources, kind="stable")
+    bounds = np.searchsorted(sources[order], np.arange(len(names) + 1))
+    targets = targets[order]
+    for n, name in enumerate(names):
+        links = "\n".join(
+            f'            <li><a href="{names[target]}">{names[target][:-5]}</a></li>'
+            for target in targets[bounds[n]:bounds[n + 1]].tolist()
+        )
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(PAGE.format(title=name[:-5], links=links))
+
+
+def write_edge_list(output, names, sources, targets):
+    """
+    Write `names` and the links from `sources` to `targets` in the binary
+    edge list format of `crawler.crawl_edges`, to `output` + ".names" and
+    `output` + ".edges".
+    """
+    write_names(output, names)
+    edges = np.empty(len(sources), dtype=EDGE)
+    edges["source"] = sources
+    edges["target"] = targets
+    edges.tofile(output + ".edges")
+
+
+if __name__ == "__main__":
+    main()
@@ -35,6 +35,64 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class WordIndex():
+
+    def __init__(self, words):
+        """
+        Create an index of `words`, numbering each word and storing sets
+        of words as bitsets, with bit n set if word n is in the set.
+        """
+        self.words = []
+        self.numbers = dict()
+
+        # Bitset of words of each length
+        self.lengths = dict()
+
+        # Bitsets of words with each letter at each position, by letter,
+        # for each position
+        self.patterns = dict()
+
+        for word in sorted(words):
+            self.add(word)
+
+    def add(self, word):
+        """Add `word` to the index if needed, and return its number."""
+        if word in self.numbers:
+            return self.numbers[word]
+        n = len(self.words)
+        self.words.append(word)
+        self.numbers[word] = n
+        bit = 1 << n
+        self.lengths[len(word)] = self.lengths.get(len(word), 0) | bit
+        for position, letter in enumerate(word):
+            letters = self.patterns.setdefault(position, dict())
+            letters[letter] = letters.get(letter, 0) | bit
+        return n
+
+    def mask(self, words):
+        """Return the bitset of `words`, adding any missing from the index."""
+        mask = 0
+        for word in words:
+            mask |= 1 << self.add(word)
+        return mask
+
+    def unmask(self, mask):
+        """Return the list of words in bitset `mask`."""
+        words = []
+        while mask:
+            low = mask & -mask
+            words.append(self.words[low.bit_length() - 1])
+            mask ^= low
+        return words
+
+    def letters(self, position):
+        """
+        Return a dictionary mapping each letter to the bitset of words
+        with that letter at `position`.
+        """
+        return self.patterns.get(position, dict())
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
@@ -60,6 +118,7 @@ class Crossword():
         # Save vocabulary list
         with open(words_file) as f:
             self.words = set(f.read().upper().splitlines())
+        self.index = WordIndex(self.words)
 
         # Determine variable set
         self.variables = set()
@@ -1,4 +1,5 @@
 import sys
+from collections import deque
 
 from crossword import *
 
@@ -14,6 +15,13 @@ class CrosswordCreator:
             var: self.crossword.words.copy() for var in self.crossword.variables
         }
 
+        # Bitset of each domain in `self.crossword.index`, with the domain
+        # set it was computed from
+        self.masks = dict()
+
+        # Number of arcs revised by `ac3`
+        self.revisions = 0
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -103,12 +111,35 @@ class CrosswordCreator:
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        domain = self.domains.copy()
-        for var in domain:
-            for word in domain[var].copy():
-                # Remove words not satisfying the unary constraint
-                if len(word) != var.length:
-                    self.domains[var].remove(word)
+        lengths = self.crossword.index.lengths
+        for var in self.domains:
+            # Keep only words of the right length
+            self.restrict(var, self.domain_mask(var) & lengths.get(var.length, 0))
+
+    def domain_mask(self, var):
+        """
+        Return the bitset of the words in the domain of `var`, computing it
+        again if `self.domains[var]` was changed other than by `restrict`.
+        """
+        domain = self.domains[var]
+        cached = self.masks.get(var)
+        if cached is None or cached[0] is not domain or cached[1].bit_count() != len(domain):
+            cached = self.masks[var] = (domain, self.crossword.index.mask(domain))
+        return cached[1]
+
+    def restrict(self, var, mask):
+        """
+        Remove every word not in bitset `mask` from the domain of `var`.
+        Return True if any word was removed; return False otherwise.
+        """
+        old_mask = self.domain_mask(var)
+        removed = old_mask & ~mask
+        if not removed:
+            return False
+        domain = self.domains[var]
+        domain.difference_update(self.crossword.index.unmask(removed))
+        self.masks[var] = (domain, old_mask & mask)
+        return True
 
     def revise(self, x, y):
         """
@@ -119,27 +150,21 @@ class CrosswordCreator:
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        x_domain = self.domains[x].copy()
-        y_domain = self.domains[y].copy()
         intersection = self.crossword.overlaps[x, y]
         # No changes made if there is no overlap
         if intersection is None:
             return False
 
-        revised = False
-        # For each value in domain of x check for a possible value of y
-        for x_val in x_domain:
-            found = False
-            for y_val in y_domain:
-                # Corresponding value for y found
-                if x_val[intersection[0]] == y_val[intersection[1]]:
-                    found = True
-            if not found:
-                # Remove the value if there is no corresponding value for y
-                self.domains[x].remove(x_val)
-                revised = True
-
-        return revised
+        # Find the letters some value of y has at the overlap, and keep the
+        # values of x with one of those letters at the overlap
+        index = self.crossword.index
+        y_mask = self.domain_mask(y)
+        x_letters = index.letters(intersection[0])
+        supported = 0
+        for letter, words in index.letters(intersection[1]).items():
+            if words & y_mask:
+                supported |= x_letters.get(letter, 0)
+        return self.restrict(x, supported)
 
     def ac3(self, arcs=None):
         """
@@ -150,20 +175,36 @@ class CrosswordCreator:
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        # If arcs is None, begin with initial list of all arcs
+        # If arcs is None, begin with every pair of overlapping variables
         if arcs is None:
-            arcs = list(self.crossword.overlaps.keys())
+            arcs = [
+                arc for arc, overlap in self.crossword.overlaps.items()
+                if overlap is not None
+            ]
+        queue = deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+        neighbors = {
+            var: self.crossword.neighbors(var) for var in self.crossword.variables
+        }
 
-        while arcs != []:
-            (x, y) = arcs.pop(0)
+        while queue:
+            arc = queue.popleft()
+            queued.remove(arc)
+            x, y = arc
+            self.revisions += 1
             if self.revise(x, y):
                 # If domain is empty after the revision, it is not consistent
                 if len(self.domains[x]) == 0:
                     return False
-                # Add arcs dependent on the domain of x for a possible issue
-                for z in self.crossword.neighbors(x):
-                    if z != y:
-                        arcs.append((z, x))
+                # Add arcs dependent on the domain of x, unless already queued
+                for z in neighbors[x]:
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
 
         return True
 